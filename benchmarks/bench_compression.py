@@ -0,0 +1,61 @@
+import sys
+import os.path
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from discretizer import LinearDiscretizer, SigmoidDiscretizer
+
+
+# compression ratio and throughput of the lossless bucket stream stage on
+# synthetic signals:
+# > python benchmarks/bench_compression.py
+
+
+COUNT = 1000000
+
+
+def signals():
+    rng = np.random.RandomState(0)
+    t = np.linspace(0.0, 40.0 * np.pi, COUNT)
+    return [
+        ('smooth', np.sin(t) + rng.normal(0.0, 0.0005, COUNT)),
+        ('noisy', rng.uniform(-1.0, 1.0, COUNT)),
+        ('constant', np.full(COUNT, 0.25)),
+    ]
+
+
+def best(func):
+    return min(timeit.repeat(func, number=1, repeat=3))
+
+
+def main():
+    discretizers = [LinearDiscretizer(1, -1.0, 1.0),
+                    LinearDiscretizer(2, -1.0, 1.0),
+                    SigmoidDiscretizer(2, -1.0, 1.0, 5.0),
+                    LinearDiscretizer(3, -1.0, 1.0)]
+    print('%-9s %-22s %-7s %8s %14s %14s' %
+          ('signal', 'discretizer', 'method', 'ratio', 'enc (Mval/s)',
+           'dec (Mval/s)'))
+    for name, vals in signals():
+        for d in discretizers:
+            label = '%s(%d)' % (type(d).__name__, d.num_bytes)
+            raw = d.encode_array(vals)
+            t_enc = best(lambda: d.encode_array(vals))
+            t_dec = best(lambda: d.decode_array(raw))
+            print('%-9s %-22s %-7s %8.2f %14.1f %14.1f' %
+                  (name, label, 'none', 1.0, COUNT / t_enc / 1e6,
+                   COUNT / t_dec / 1e6))
+            for method in ('delta', 'rle'):
+                data = d.encode_compressed(vals, method)
+                t_enc = best(lambda: d.encode_compressed(vals, method))
+                t_dec = best(lambda: d.decode_compressed(data))
+                print('%-9s %-22s %-7s %8.2f %14.1f %14.1f' %
+                      (name, label, method, float(raw.size) / len(data),
+                       COUNT / t_enc / 1e6, COUNT / t_dec / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import sys
+import os.path
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discretizer import BaseDiscretizer, LinearDiscretizer
+
+
+# compares the string based bit conversion helpers against the integer
+# packing used by encode/decode, for every supported width:
+# > python benchmarks/bench_packing.py
+
+
+NUMBER = 100000
+
+
+def legacy_pack(d, bucket_num):
+    ba = BaseDiscretizer.bucket_num_to_bytearray(bucket_num)
+    len_ba = len(ba)
+    if len_ba != d.num_bytes:
+        ba.reverse()
+        for i in range(d.num_bytes - len_ba):
+            ba.append(0)
+        ba.reverse()
+    return ba
+
+
+def legacy_unpack(d, ba):
+    return BaseDiscretizer.bytearray_to_bucket_num(ba)
+
+
+def per_call(func):
+    return min(timeit.repeat(func, number=NUMBER, repeat=3)) / NUMBER
+
+
+def main():
+    print('%-9s %-8s %12s %12s %8s' %
+          ('num_bytes', 'path', 'legacy (ns)', 'packed (ns)', 'speedup'))
+    for num_bytes in range(1, 8):
+        d = LinearDiscretizer(num_bytes, 0.0, 1.0)
+        bucket_num = d.max_bucket // 3
+        ba = d.encode(1.0 / 3.0)
+        val = 1.0 / 3.0
+        rows = [
+            ('pack', lambda: legacy_pack(d, bucket_num),
+             lambda: d._pack_bucket_num(bucket_num)),
+            ('unpack', lambda: legacy_unpack(d, ba),
+             lambda: d._unpack_bucket_num(ba)),
+            ('encode',
+             lambda: legacy_pack(d, d.val_to_bucket_num(val)),
+             lambda: d.encode(val)),
+            ('decode',
+             lambda: d.bucket_num_to_val(legacy_unpack(d, ba)),
+             lambda: d.decode(ba)),
+        ]
+        for name, old, new in rows:
+            t_old = per_call(old)
+            t_new = per_call(new)
+            print('%-9d %-8s %12.1f %12.1f %7.1fx' %
+                  (num_bytes, name, t_old * 1e9, t_new * 1e9, t_old / t_new))
+
+
+if __name__ == '__main__':
+    main()
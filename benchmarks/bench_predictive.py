@@ -0,0 +1,66 @@
+import sys
+import os.path
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from discretizer import LinearDiscretizer, SigmoidDiscretizer, \
+    PredictiveCodec
+
+
+# bytes per sample against reconstruction error for plain and predictive
+# encoding of synthetic telemetry:
+# > python benchmarks/bench_predictive.py
+
+
+COUNT = 1000000
+
+
+def signals():
+    rng = np.random.RandomState(0)
+    t = np.linspace(0.0, 20.0 * np.pi, COUNT)
+    return [
+        ('slow sine', 50.0 * np.sin(t) + rng.normal(0.0, 0.01, COUNT)),
+        ('random walk', np.clip(np.cumsum(rng.normal(0.0, 0.05, COUNT)),
+                                -100.0, 100.0)),
+        ('noisy', rng.uniform(-100.0, 100.0, COUNT)),
+    ]
+
+
+def best(func):
+    return min(timeit.repeat(func, number=1, repeat=3))
+
+
+def codecs():
+    for num_bytes in (1, 2, 3):
+        d = LinearDiscretizer(num_bytes, -100.0, 100.0)
+        yield 'plain %d' % num_bytes, d.encode_array, d.decode_array
+    for key_bytes, res_bytes, res_range in ((2, 1, 0.5), (3, 1, 0.5),
+                                            (3, 2, 0.5)):
+        codec = PredictiveCodec(
+            LinearDiscretizer(key_bytes, -100.0, 100.0),
+            SigmoidDiscretizer(res_bytes, -res_range, res_range, 10.0))
+        label = 'pred %d+%d' % (key_bytes, res_bytes)
+        yield label, codec.encode_array, codec.decode_array
+
+
+def main():
+    print('%-12s %-10s %9s %12s %12s %10s %10s' %
+          ('signal', 'codec', 'bytes/val', 'max err', 'rms err',
+           'enc Mv/s', 'dec Mv/s'))
+    for name, vals in signals():
+        for label, encode, decode in codecs():
+            buf = encode(vals)
+            err = decode(buf) - vals
+            t_enc = best(lambda: encode(vals))
+            t_dec = best(lambda: decode(buf))
+            print('%-12s %-10s %9.3f %12.3g %12.3g %10.1f %10.1f' %
+                  (name, label, float(buf.size) / vals.size,
+                   np.abs(err).max(), np.sqrt(np.mean(err ** 2)),
+                   COUNT / t_enc / 1e6, COUNT / t_dec / 1e6))
+
+
+if __name__ == '__main__':
+    main()
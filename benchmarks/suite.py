@@ -0,0 +1,186 @@
+import argparse
+import json
+import os.path
+import platform
+import statistics
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from discretizer import LinearDiscretizer, CubeRootDiscretizer, \
+    SigmoidDiscretizer
+
+
+# benchmark suite covering every discretizer class, widths 1-7, scalar,
+# fast_codec(validate=False) and batch paths, and in-range vs clamped inputs:
+# > python benchmarks/suite.py --output results.json
+# baselines are machine specific and not stored in the repository, record
+# one on the machine doing the comparison before changing the code:
+# > python benchmarks/suite.py --output baseline.json
+# then compare against it (exit status 1 on regressions):
+# > python benchmarks/suite.py --baseline baseline.json
+
+
+DISCRETIZERS = {
+    'LinearDiscretizer': lambda n: LinearDiscretizer(n, -10.0, 20.0),
+    'CubeRootDiscretizer': lambda n: CubeRootDiscretizer(n, -10.0, 20.0),
+    'SigmoidDiscretizer': lambda n: SigmoidDiscretizer(n, -10.0, 20.0, 20.0),
+}
+NUM_BYTES = range(1, 8)
+MODES = ('scalar', 'fast', 'batch')
+OPS = ('encode', 'decode')
+INPUTS = ('in_range', 'clamped')
+
+SCALAR_COUNT = 2000
+BATCH_COUNT = 200000
+# each case is timed REPEAT times, every time over enough calls to last at
+# least MIN_RUN_TIME seconds, and the median is compared
+REPEAT = 9
+MIN_RUN_TIME = 0.05
+DEFAULT_TOLERANCE = 0.25
+
+
+def make_inputs(kind, count):
+    rng = np.random.RandomState(0)
+    if kind == 'in_range':
+        return rng.uniform(-10.0, 20.0, count)
+    # half below and half above the range
+    vals = rng.uniform(20.0, 50.0, count)
+    vals[::2] -= 60.0
+    return vals
+
+
+def time_case(d, mode, op, vals):
+    if mode == 'scalar':
+        if op == 'encode':
+            items = vals.tolist()
+            func = lambda: [d.encode(v) for v in items]
+        else:
+            buf = d.encode_array(vals)
+            n = d.num_bytes
+            items = [bytearray(buf[i:i + n]) for i in range(0, buf.size, n)]
+            func = lambda: [d.decode(ba) for ba in items]
+    elif mode == 'fast':
+        encode, decode = d.fast_codec(validate=False)
+        if op == 'encode':
+            items = vals.tolist()
+            func = lambda: [encode(v) for v in items]
+        else:
+            buf = d.encode_array(vals)
+            n = d.num_bytes
+            items = [bytearray(buf[i:i + n]) for i in range(0, buf.size, n)]
+            func = lambda: [decode(ba) for ba in items]
+    else:
+        if op == 'encode':
+            func = lambda: d.encode_array(vals)
+        else:
+            buf = d.encode_array(vals)
+            func = lambda: d.decode_array(buf)
+
+    # warm up once so lazily built tables are not timed
+    func()
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < MIN_RUN_TIME:
+        number *= 2
+    times = [t / number for t in timer.repeat(repeat=REPEAT, number=number)]
+    median = statistics.median(times)
+    return {'ops_per_sec': vals.size / median,
+            'ns_per_value': 1e9 * median / vals.size,
+            'ns_per_value_min': 1e9 * min(times) / vals.size}
+
+
+def run_suite(names=None, num_bytes=None, modes=None, quick=False):
+    results = {}
+    for name in names or sorted(DISCRETIZERS):
+        for n in num_bytes or NUM_BYTES:
+            d = DISCRETIZERS[name](n)
+            for mode in modes or MODES:
+                count = BATCH_COUNT if mode == 'batch' else SCALAR_COUNT
+                if quick:
+                    count //= 10
+                for kind in INPUTS:
+                    vals = make_inputs(kind, count)
+                    for op in OPS:
+                        key = '%s/%d/%s/%s/%s' % (name, n, mode, op, kind)
+                        results[key] = time_case(d, mode, op, vals)
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor()}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # a case regresses when its median per-value latency grows by more
+    # than the tolerance relative to the baseline
+    regressions = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        old = baseline[key]['ns_per_value']
+        new = results[key]['ns_per_value']
+        if new > old * (1.0 + tolerance):
+            regressions.append((key, old, new))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print('%-48s %14s %12s %10s' % ('case', 'ops/sec', 'ns/value',
+                                    'vs base'))
+    for key in sorted(results):
+        r = results[key]
+        change = ''
+        if baseline and key in baseline:
+            change = '%+9.1f%%' % (100.0 * (r['ns_per_value'] /
+                                            baseline[key]['ns_per_value'] -
+                                            1.0))
+        print('%-48s %14.0f %12.1f %10s' % (key, r['ops_per_sec'],
+                                            r['ns_per_value'], change))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Discretizer benchmarks.')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='compare with a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown fraction (default %(default)s)')
+    parser.add_argument('--class', dest='names', action='append',
+                        choices=sorted(DISCRETIZERS))
+    parser.add_argument('--num-bytes', type=int, action='append',
+                        choices=list(NUM_BYTES))
+    parser.add_argument('--mode', dest='modes', action='append',
+                        choices=MODES)
+    parser.add_argument('--quick', action='store_true',
+                        help='use 10x fewer values per case')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.names, args.num_bytes, args.modes, args.quick)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f,
+                      indent=1, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for key, old, new in regressions:
+            print('REGRESSION %s: %.1f -> %.1f ns/value' % (key, old, new))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
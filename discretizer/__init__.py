@@ -1,2 +1,11 @@
 from .discretizers import BaseDiscretizer, DiscretizerException, \
-    LinearDiscretizer, CubeRootDiscretizer, SigmoidDiscretizer
+    LinearDiscretizer, CubeRootDiscretizer, SigmoidDiscretizer, \
+    QuantileDiscretizer, FunctionDiscretizer, discretizer_from_spec
+from .columns import ColumnReader, ColumnWriter, write_column
+from .records import RecordCodec
+from .predictive import PredictiveCodec
+from .blocks import BlockQuantizer
+from .distances import DistanceKernel
+from .queries import BucketIndex
+from .aggregates import BucketAggregate
+from .arrays import DiscretizedArray
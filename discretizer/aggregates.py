@@ -0,0 +1,138 @@
+import numpy as np
+
+from .discretizers import DiscretizerException, buffer_to_buckets
+
+
+# buffers from discretizers up to this many bits are counted with a dense
+# bincount, wider ones with a sort
+DENSE_MAX_BITS = 16
+
+
+class BucketAggregate(object):
+    # approximate aggregates over packed buffers, kept as counts per used
+    # bucket so no value is decoded; every estimate comes with an absolute
+    # error bound from the widths of the buckets involved, which holds for
+    # values inside [val_min, val_max] (clamped values are unbounded)
+    def __init__(self, discretizer, buf=None):
+        self._discretizer = discretizer
+        self._buckets = np.zeros(0, dtype=np.uint64)
+        self._counts = np.zeros(0, dtype=np.int64)
+        if buf is not None:
+            self.add(buf)
+
+    @property
+    def discretizer(self):
+        return self._discretizer
+
+    @property
+    def buckets(self):
+        # used bucket numbers in ascending order
+        return self._buckets
+
+    @property
+    def counts(self):
+        return self._counts
+
+    def add(self, buf):
+        d = self._discretizer
+        bucket_nums = buffer_to_buckets(buf, d.num_bytes)
+        if bucket_nums.size == 0:
+            return self
+        if int(bucket_nums.max()) > d.max_bucket:
+            raise DiscretizerException('Bucket number must be <= maximum.')
+        if d.num_bits <= DENSE_MAX_BITS:
+            counts = np.bincount(bucket_nums.astype(np.intp),
+                                 minlength=d.num_buckets)
+            buckets = np.flatnonzero(counts)
+            self._add_counts(buckets.astype(np.uint64), counts[buckets])
+        else:
+            buckets, counts = np.unique(bucket_nums, return_counts=True)
+            self._add_counts(buckets, counts)
+        return self
+
+    def merge(self, other):
+        # combines the counts of another aggregate, e.g. of an earlier chunk
+        if (other.discretizer is not self._discretizer and
+                other.discretizer.spec() != self._discretizer.spec()):
+            raise DiscretizerException('Aggregates use different '
+                                       'discretizers.')
+        self._add_counts(other.buckets, other.counts)
+        return self
+
+    def _add_counts(self, buckets, counts):
+        if self._buckets.size == 0:
+            self._buckets = np.asarray(buckets, dtype=np.uint64)
+            self._counts = np.asarray(counts, dtype=np.int64)
+            return
+        merged, inverse = np.unique(
+            np.concatenate([self._buckets, buckets]), return_inverse=True)
+        totals = np.zeros(merged.size, dtype=np.int64)
+        np.add.at(totals, inverse, np.concatenate([self._counts, counts]))
+        self._buckets = merged
+        self._counts = totals
+
+    def _values_and_errors(self, buckets):
+        # decoded value of each bucket and the furthest a true value can lie
+        # from it
+        vals = self._discretizer.bucket_nums_to_vals(buckets)
+        lower, upper = self._discretizer.bucket_ranges(buckets)
+        return vals, np.maximum(vals - lower, upper - vals)
+
+    def _check_not_empty(self):
+        if self._buckets.size == 0:
+            raise DiscretizerException('No values aggregated.')
+
+    def count(self):
+        return int(self._counts.sum())
+
+    def sum(self):
+        # returns (estimate, error bound)
+        vals, errors = self._values_and_errors(self._buckets)
+        return (float(np.dot(self._counts, vals)),
+                float(np.dot(self._counts, errors)))
+
+    def mean(self):
+        self._check_not_empty()
+        total, error = self.sum()
+        n = float(self.count())
+        return total / n, error / n
+
+    def min(self):
+        self._check_not_empty()
+        vals, errors = self._values_and_errors(self._buckets[:1])
+        return float(vals[0]), float(errors[0])
+
+    def max(self):
+        self._check_not_empty()
+        vals, errors = self._values_and_errors(self._buckets[-1:])
+        return float(vals[0]), float(errors[0])
+
+    def quantile(self, q):
+        # inverted cdf quantiles, the true quantile lies in the same bucket
+        # as the estimate; returns (estimates, error bounds) shaped like q
+        self._check_not_empty()
+        q = np.asarray(q, dtype=np.float64)
+        if np.any((q < 0.0) | (q > 1.0)) or np.isnan(q).any():
+            raise DiscretizerException('Quantiles must be in [0, 1].')
+        cumulative = np.cumsum(self._counts)
+        rank = np.maximum(np.ceil(q.ravel() * cumulative[-1]), 1)
+        idx = np.searchsorted(cumulative, rank, side='left')
+        vals, errors = self._values_and_errors(self._buckets[idx])
+        if q.ndim == 0:
+            return float(vals[0]), float(errors[0])
+        return vals.reshape(q.shape), errors.reshape(q.shape)
+
+    def histogram(self, bins=10, range=None):
+        # histogram of the decoded values as numpy.histogram returns it,
+        # plus per bin counts of values whose bucket straddles a bin edge
+        # and so may belong to any other bin the bucket overlaps
+        vals = self._discretizer.bucket_nums_to_vals(self._buckets)
+        hist, edges = np.histogram(vals, bins=bins, range=range,
+                                   weights=self._counts)
+        lower, upper = self._discretizer.bucket_ranges(self._buckets)
+        inner = edges[1:-1]
+        straddles = (np.searchsorted(inner, lower, side='right') !=
+                     np.searchsorted(inner, upper, side='left'))
+        uncertain, _ = np.histogram(vals[straddles], bins=edges,
+                                    weights=self._counts[straddles])
+        return hist.astype(np.int64), edges, uncertain.astype(np.int64)
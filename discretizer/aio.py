@@ -0,0 +1,139 @@
+import asyncio
+import json
+import struct
+
+from .discretizers import DiscretizerException, discretizer_from_spec
+
+
+# framed stream layout (all integers big-endian):
+#   header   magic b'DSCS', uint16 version, uint32 spec length, JSON spec
+#   batches  uint32 value count, followed by count * num_bytes packed
+#            records, repeated until the writer closes the stream
+
+MAGIC = b'DSCS'
+VERSION = 1
+_HEADER = struct.Struct('>4sHI')
+_BATCH = struct.Struct('>I')
+MAX_SPEC_SIZE = 1 << 24
+
+# batches of at least this many values are encoded/decoded in a worker
+# thread so the event loop keeps running
+OFFLOAD_THRESHOLD = 65536
+
+# refuse batches larger than this many values unless configured otherwise
+MAX_BATCH_VALUES = 1 << 24
+
+
+async def _run(func, arg, count):
+    if count < OFFLOAD_THRESHOLD:
+        return func(arg)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, arg)
+
+
+class DiscretizedStreamWriter(object):
+    def __init__(self, writer, discretizer):
+        self._writer = writer
+        self._discretizer = discretizer
+        self._header_sent = False
+
+    @property
+    def discretizer(self):
+        return self._discretizer
+
+    async def write_header(self):
+        if self._header_sent:
+            return
+        spec = json.dumps(self._discretizer.spec(),
+                          sort_keys=True).encode('utf-8')
+        self._writer.write(_HEADER.pack(MAGIC, VERSION, len(spec)) + spec)
+        self._header_sent = True
+        await self._writer.drain()
+
+    async def write_batch(self, vals):
+        await self.write_header()
+        buf = await _run(self._discretizer.encode_array, vals, len(vals))
+        count = buf.size // self._discretizer.num_bytes
+        self._writer.write(_BATCH.pack(count))
+        self._writer.write(buf.tobytes())
+        await self._writer.drain()
+        return count
+
+    async def close(self):
+        await self.write_header()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+class DiscretizedStreamReader(object):
+    def __init__(self, reader, max_batch_values=MAX_BATCH_VALUES):
+        self._reader = reader
+        self._max_batch_values = max_batch_values
+        self._discretizer = None
+
+    @property
+    def discretizer(self):
+        return self._discretizer
+
+    async def read_header(self):
+        if self._discretizer is not None:
+            return self._discretizer
+        try:
+            magic, version, spec_len = _HEADER.unpack(
+                await self._reader.readexactly(_HEADER.size))
+        except asyncio.IncompleteReadError:
+            raise DiscretizerException('Stream ended inside the header.')
+        if magic != MAGIC:
+            raise DiscretizerException('Not a discretized stream.')
+        if version != VERSION:
+            raise DiscretizerException('Unsupported stream version.')
+        if spec_len > MAX_SPEC_SIZE:
+            raise DiscretizerException('Stream specification too large.')
+        try:
+            spec = json.loads((await self._reader.readexactly(spec_len))
+                              .decode('utf-8'))
+        except asyncio.IncompleteReadError:
+            raise DiscretizerException('Stream ended inside the header.')
+        except ValueError:
+            raise DiscretizerException('Invalid stream specification.')
+        self._discretizer = discretizer_from_spec(spec)
+        return self._discretizer
+
+    async def read_batch(self):
+        # returns the next batch as a float64 array, None at end of stream
+        d = await self.read_header()
+        try:
+            prefix = await self._reader.readexactly(_BATCH.size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise DiscretizerException('Stream ended inside a batch.')
+            return None
+        count = _BATCH.unpack(prefix)[0]
+        if count > self._max_batch_values:
+            raise DiscretizerException('Batch too large.')
+        try:
+            payload = await self._reader.readexactly(count * d.num_bytes)
+        except asyncio.IncompleteReadError:
+            raise DiscretizerException('Stream ended inside a batch.')
+        return await _run(d.decode_array, payload, count)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        batch = await self.read_batch()
+        if batch is None:
+            raise StopAsyncIteration
+        return batch
+
+
+async def open_writer(writer, discretizer):
+    stream = DiscretizedStreamWriter(writer, discretizer)
+    await stream.write_header()
+    return stream
+
+
+async def open_reader(reader, max_batch_values=MAX_BATCH_VALUES):
+    stream = DiscretizedStreamReader(reader, max_batch_values)
+    await stream.read_header()
+    return stream
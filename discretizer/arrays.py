@@ -0,0 +1,98 @@
+import numpy as np
+
+from .discretizers import DiscretizerException, STREAM_CHUNK_SIZE, \
+    buffer_to_buckets, buffer_to_uint8
+
+
+class DiscretizedArray(object):
+    # read-only float sequence over a packed buffer, values are decoded on
+    # access so memory stays at num_bytes per value; slices share the
+    # buffer instead of copying it
+    def __init__(self, buf, discretizer):
+        num_bytes = discretizer.num_bytes
+        if (isinstance(buf, np.ndarray) and buf.ndim == 2 and
+                buf.shape[1] != num_bytes):
+            raise DiscretizerException('Invalid number of bytes parsed.')
+        self._records = buffer_to_uint8(buf, num_bytes)
+        self._discretizer = discretizer
+
+    @staticmethod
+    def from_values(discretizer, vals):
+        return DiscretizedArray(discretizer.encode_array(vals), discretizer)
+
+    @property
+    def discretizer(self):
+        return self._discretizer
+
+    @property
+    def records(self):
+        # (len, num_bytes) uint8 view of the packed values
+        return self._records
+
+    @property
+    def shape(self):
+        return (self._records.shape[0],)
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float64)
+
+    @property
+    def nbytes(self):
+        return self._records.size
+
+    def __len__(self):
+        return self._records.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return DiscretizedArray(self._records[key], self._discretizer)
+        if isinstance(key, (int, np.integer)):
+            count = len(self)
+            if key < 0:
+                key += count
+            if key < 0 or key >= count:
+                raise IndexError('Index out of range.')
+            return self._discretizer.decode(bytearray(self._records[key]))
+        # integer or boolean index arrays decode the selected values only
+        key = np.asarray(key)
+        if key.dtype.kind not in 'iub':
+            raise DiscretizerException('Index must be an integer, slice or '
+                                       'index array.')
+        try:
+            selected = self._records[key]
+        except IndexError:
+            raise IndexError('Index out of range.')
+        return self._discretizer.decode_array(selected)
+
+    def chunks(self, chunk_size=STREAM_CHUNK_SIZE):
+        # decoded float64 arrays of at most chunk_size values
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise DiscretizerException('Chunk size must be an integer > 0.')
+        for start in range(0, len(self), chunk_size):
+            yield self._discretizer.decode_array(
+                self._records[start:start + chunk_size])
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            for val in chunk.tolist():
+                yield val
+
+    def __array__(self, dtype=None, copy=None):
+        if copy is False:
+            raise ValueError('Decoding always creates a new array.')
+        vals = self._discretizer.decode_array(self._records)
+        return vals if dtype is None else vals.astype(dtype)
+
+    def decode(self):
+        return self._discretizer.decode_array(self._records)
+
+    def bucket_nums(self):
+        return buffer_to_buckets(self._records, self._discretizer.num_bytes)
+
+    def tobytes(self):
+        return self._records.tobytes()
+
+    def __repr__(self):
+        return 'DiscretizedArray(len=%d, %s)' % (
+            len(self), type(self._discretizer).__name__)
@@ -0,0 +1,192 @@
+import numpy as np
+
+from .discretizers import DiscretizerException, LinearDiscretizer, \
+    SigmoidDiscretizer, buckets_to_buffer, buffer_to_buckets, \
+    buffer_to_uint8
+
+
+# parameter types for the per-block ranges, float32 ranges are rounded
+# outwards so every value stays inside its block
+PARAM_DTYPES = ('f4', 'f8')
+
+
+class BlockQuantizer(object):
+    # quantizes n-d arrays with a range per block, either one block per
+    # index along an axis (e.g. per channel or row) or consecutive blocks of
+    # block_size values of the flattened array; values are normalised to
+    # [0, 1] with their block range and encoded by a single [0, 1]
+    # discretizer, linear or sigmoid when a sharpness is given
+    # encoded layout: block minima, block maxima (big-endian param_dtype),
+    # then the values' fixed width records in C order
+    def __init__(self, num_bytes, axis=None, block_size=None, sharpness=None,
+                 num_bits=None, param_dtype='f4'):
+        if (axis is None) == (block_size is None):
+            raise DiscretizerException('Give exactly one of axis and '
+                                       'block size.')
+        if axis is not None and not isinstance(axis, int):
+            raise DiscretizerException('Axis must be an integer.')
+        if block_size is not None and (not isinstance(block_size, int) or
+                                       block_size <= 0):
+            raise DiscretizerException('Block size must be an integer > 0.')
+        if param_dtype not in PARAM_DTYPES:
+            raise DiscretizerException('Unknown parameter type.')
+        if sharpness is None:
+            self._unit = LinearDiscretizer(num_bytes, 0.0, 1.0, num_bits)
+        else:
+            self._unit = SigmoidDiscretizer(num_bytes, 0.0, 1.0, sharpness,
+                                            num_bits)
+        self._axis = axis
+        self._block_size = block_size
+        self._sharpness = sharpness
+        self._param_dtype = np.dtype('>' + param_dtype)
+
+    @property
+    def discretizer(self):
+        # the [0, 1] discretizer shared by every block
+        return self._unit
+
+    @property
+    def num_bytes(self):
+        return self._unit.num_bytes
+
+    @property
+    def axis(self):
+        return self._axis
+
+    @property
+    def block_size(self):
+        return self._block_size
+
+    def spec(self):
+        spec = {'num_bytes': self._unit.num_bytes,
+                'param_dtype': self._param_dtype.str[1:]}
+        if self._unit.num_bits != 8 * self._unit.num_bytes:
+            spec['num_bits'] = self._unit.num_bits
+        if self._axis is not None:
+            spec['axis'] = self._axis
+        else:
+            spec['block_size'] = self._block_size
+        if self._sharpness is not None:
+            spec['sharpness'] = self._sharpness
+        return spec
+
+    @staticmethod
+    def from_spec(spec):
+        try:
+            return BlockQuantizer(**spec)
+        except TypeError:
+            raise DiscretizerException('Invalid block quantizer '
+                                       'specification.')
+
+    def _axis_index(self, ndim):
+        axis = self._axis
+        if axis < 0:
+            axis += ndim
+        if axis < 0 or axis >= ndim:
+            raise DiscretizerException('Axis out of range.')
+        return axis
+
+    def num_blocks(self, shape):
+        shape = tuple(shape)
+        if self._axis is not None:
+            return shape[self._axis_index(len(shape))]
+        return -(-int(np.prod(shape, dtype=np.int64)) // self._block_size)
+
+    def encoded_size(self, shape):
+        count = int(np.prod(tuple(shape), dtype=np.int64))
+        return (2 * self.num_blocks(shape) * self._param_dtype.itemsize +
+                count * self._unit.num_bytes)
+
+    def _blocks(self, arr):
+        # the array as (blocks, values per block) plus a function mapping
+        # per-block results back to the array's C order
+        if self._axis is not None:
+            axis = self._axis_index(arr.ndim)
+            moved = np.moveaxis(arr, axis, 0)
+            rows = moved.reshape(moved.shape[0], -1)
+
+            def restore(out):
+                out = out.reshape(moved.shape)
+                return np.moveaxis(out, 0, axis).ravel()
+            return rows, restore
+        flat = arr.ravel()
+        count = flat.size
+        num_blocks = -(-count // self._block_size)
+        rows = np.empty(num_blocks * self._block_size, dtype=flat.dtype)
+        rows[:count] = flat
+        # padding repeats the last value, so it never widens a range
+        rows[count:] = flat[-1] if count else 0
+        return rows.reshape(num_blocks, self._block_size), \
+            lambda out: out.ravel()[:count]
+
+    def _ranges(self, rows):
+        mins = rows.min(axis=1) if rows.shape[1] else np.zeros(rows.shape[0])
+        maxs = rows.max(axis=1) if rows.shape[1] else np.zeros(rows.shape[0])
+        with np.errstate(over='ignore'):
+            lo = mins.astype(self._param_dtype)
+            hi = maxs.astype(self._param_dtype)
+        if not (np.isfinite(lo).all() and np.isfinite(hi).all()):
+            raise DiscretizerException('Block ranges exceed the parameter '
+                                       'type.')
+        # round outwards when the parameters are narrower than the values
+        lo = np.where(lo > mins, np.nextafter(lo, -np.inf), lo) \
+            .astype(self._param_dtype)
+        hi = np.where(hi < maxs, np.nextafter(hi, np.inf), hi) \
+            .astype(self._param_dtype)
+        return lo, hi
+
+    def encode(self, arr):
+        arr = np.asarray(arr)
+        if arr.dtype.kind != 'f':
+            raise DiscretizerException('Values must be floats.')
+        if arr.ndim == 0:
+            raise DiscretizerException('Values must be an array.')
+        if not np.isfinite(arr).all():
+            raise DiscretizerException('Values must be finite.')
+        rows, restore = self._blocks(arr.astype(np.float64, copy=False))
+        lo, hi = self._ranges(rows)
+        mins = lo.astype(np.float64)
+        span = hi.astype(np.float64) - mins
+        span[span == 0.0] = 1.0
+        v = (rows - mins[:, None]) / span[:, None]
+        bucket_nums = self._unit.vals_to_bucket_nums(restore(v))
+        return np.concatenate([lo.view(np.uint8), hi.view(np.uint8),
+                               buckets_to_buffer(bucket_nums,
+                                                 self._unit.num_bytes)])
+
+    def block_ranges(self, buf, shape):
+        # per-block (minima, maxima) stored in an encoded buffer
+        raw = self._raw(buf, shape)
+        num_blocks = self.num_blocks(shape)
+        params = raw[:2 * num_blocks * self._param_dtype.itemsize]
+        params = params.view(self._param_dtype).astype(np.float64)
+        return params[:num_blocks], params[num_blocks:]
+
+    def decode(self, buf, shape):
+        shape = tuple(shape)
+        raw = self._raw(buf, shape)
+        lo, hi = self.block_ranges(raw, shape)
+        span = hi - lo
+        span[span == 0.0] = 1.0
+        offset = 2 * lo.size * self._param_dtype.itemsize
+        bucket_nums = buffer_to_buckets(raw[offset:], self._unit.num_bytes)
+        v = self._unit.bucket_nums_to_vals(bucket_nums).reshape(shape)
+        if self._axis is not None:
+            axis = self._axis_index(len(shape))
+            index = [np.newaxis] * len(shape)
+            index[axis] = slice(None)
+            index = tuple(index)
+            return lo[index] + v * span[index]
+        count = v.size
+        num_blocks = lo.size
+        rows = np.zeros(num_blocks * self._block_size, dtype=np.float64)
+        rows[:count] = v.ravel()
+        rows = rows.reshape(num_blocks, self._block_size)
+        out = lo[:, None] + rows * span[:, None]
+        return out.ravel()[:count].reshape(shape)
+
+    def _raw(self, buf, shape):
+        raw = buffer_to_uint8(buf)
+        if raw.size != self.encoded_size(shape):
+            raise DiscretizerException('Invalid number of bytes parsed.')
+        return raw
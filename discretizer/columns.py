@@ -0,0 +1,179 @@
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .arrays import DiscretizedArray
+from .discretizers import DiscretizerException, buffer_to_buckets, \
+    discretizer_from_spec
+
+
+# column file layout (all integers big-endian):
+#   magic          4 bytes   b'DSCC'
+#   version        uint16
+#   spec length    uint32    length of the JSON discretizer spec in bytes
+#   count          uint64    number of records in the payload
+#   spec           JSON      discretizer.spec(), utf-8
+#   padding        zeros     up to the next multiple of 8 bytes
+#   payload        count * num_bytes packed big-endian records
+
+MAGIC = b'DSCC'
+VERSION = 1
+_PREAMBLE = struct.Struct('>4sHIQ')
+_COUNT_OFFSET = 10
+_ALIGNMENT = 8
+
+
+def _header(d, count):
+    spec = json.dumps(d.spec(), sort_keys=True).encode('utf-8')
+    header = _PREAMBLE.pack(MAGIC, VERSION, len(spec), count) + spec
+    return header + bytes(-len(header) % _ALIGNMENT)
+
+
+class ColumnWriter(object):
+    def __init__(self, path, discretizer):
+        self._discretizer = discretizer
+        self._count = 0
+        # the header is built first so discretizers without a spec leave
+        # the target file untouched
+        header = _header(discretizer, 0)
+        self._file = open(path, 'wb')
+        self._file.write(header)
+
+    @property
+    def discretizer(self):
+        return self._discretizer
+
+    @property
+    def count(self):
+        return self._count
+
+    def append(self, vals):
+        buf = self._discretizer.encode_array(vals)
+        self._file.write(buf.tobytes())
+        self._count += buf.size // self._discretizer.num_bytes
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(_COUNT_OFFSET)
+        self._file.write(struct.pack('>Q', self._count))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_column(path, discretizer, vals):
+    with ColumnWriter(path, discretizer) as writer:
+        writer.append(vals)
+
+
+class ColumnReader(object):
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            # empty files cannot be mapped
+            if os.fstat(f.fileno()).st_size < _PREAMBLE.size:
+                raise DiscretizerException('File too short for a column '
+                                           'header.')
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse_header()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _parse_header(self):
+        if len(self._mmap) < _PREAMBLE.size:
+            raise DiscretizerException('File too short for a column header.')
+        magic, version, spec_len, count = \
+            _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise DiscretizerException('Not a discretized column file.')
+        if version != VERSION:
+            raise DiscretizerException('Unsupported column file version.')
+        spec_end = _PREAMBLE.size + spec_len
+        try:
+            spec = json.loads(self._mmap[_PREAMBLE.size:spec_end]
+                              .decode('utf-8'))
+        except ValueError:
+            raise DiscretizerException('Invalid column specification.')
+        self._discretizer = discretizer_from_spec(spec)
+        self._count = count
+        self._offset = spec_end + (-spec_end % _ALIGNMENT)
+        stride = self._discretizer.num_bytes
+        if len(self._mmap) < self._offset + count * stride:
+            raise DiscretizerException('Column file is truncated.')
+
+        self._records = self._view_records()
+
+    def _view_records(self):
+        # zero-copy view of the payload, one row per record
+        stride = self._discretizer.num_bytes
+        records = np.frombuffer(self._mmap, dtype=np.uint8,
+                                count=self._count * stride,
+                                offset=self._offset)
+        return records.reshape(self._count, stride)
+
+    @property
+    def discretizer(self):
+        return self._discretizer
+
+    @property
+    def num_bytes(self):
+        return self._discretizer.num_bytes
+
+    @property
+    def records(self):
+        # (count, num_bytes) uint8 view into the mapped file
+        return self._records
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._discretizer.decode_array(self._records[key])
+        if not isinstance(key, (int, np.integer)):
+            raise DiscretizerException('Index must be an integer or slice.')
+        if key < 0:
+            key += self._count
+        if key < 0 or key >= self._count:
+            raise IndexError('Column index out of range.')
+        return self._discretizer.decode(bytearray(self._records[key]))
+
+    def raw(self, start=None, stop=None):
+        # packed records as a zero-copy flat uint8 view
+        return self._records[start:stop].reshape(-1)
+
+    def bucket_nums(self, start=None, stop=None):
+        return buffer_to_buckets(self.raw(start, stop), self.num_bytes)
+
+    def array(self, start=None, stop=None):
+        # lazily decoded view into the mapped file, it must be released
+        # before close() like records and raw() views
+        return DiscretizedArray(self._records[start:stop], self._discretizer)
+
+    def close(self):
+        if self._mmap.closed:
+            return
+        self._records = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            # the reader stays open and usable
+            self._records = self._view_records()
+            raise DiscretizerException('Column views are still in use, '
+                                       'release arrays from records, raw() '
+                                       'and array() before closing.')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,127 @@
+import numpy as np
+
+from .discretizers import DiscretizerException, buffer_to_uint8
+
+
+# lossless compression of bucket number streams:
+#   'delta'  differences between neighbouring bucket numbers, zigzag
+#            mapped to unsigned and written as LEB128 varints
+#   'rle'    runs of equal bucket numbers, the run values delta coded as
+#            above followed by the run lengths as varints
+# every stream starts with a method byte and the value count as a varint
+
+METHODS = {'delta': 1, 'rle': 2}
+_METHOD_NAMES = dict((v, k) for k, v in METHODS.items())
+
+
+def zigzag_encode(deltas):
+    # 0, -1, 1, -2, 2, ... -> 0, 1, 2, 3, 4, ...
+    deltas = np.asarray(deltas, dtype=np.int64)
+    return ((deltas << 1) ^ (deltas >> 63)).view(np.uint64)
+
+
+def zigzag_decode(codes):
+    codes = np.asarray(codes, dtype=np.uint64)
+    return ((codes >> np.uint64(1)).view(np.int64) ^
+            -(codes & np.uint64(1)).view(np.int64))
+
+
+def encode_varints(vals):
+    vals = np.asarray(vals, dtype=np.uint64).ravel()
+    if vals.size == 0:
+        return np.zeros(0, dtype=np.uint8)
+
+    # 7 payload bits per byte, the high bit flags a following byte
+    lengths = np.ones(vals.size, dtype=np.int64)
+    for k in range(1, 10):
+        lengths += vals >= np.uint64(1 << (7 * k))
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max())):
+        idx = np.flatnonzero(lengths > k)
+        chunk = (vals[idx] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        chunk |= np.where(lengths[idx] > k + 1, np.uint64(0x80),
+                          np.uint64(0))
+        out[starts[idx] + k] = chunk
+    return out
+
+
+def decode_varints(buf):
+    raw = np.asarray(buf, dtype=np.uint8).ravel()
+    if raw.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    if raw[-1] & 0x80:
+        raise DiscretizerException('Truncated varint.')
+    last = raw < 0x80
+    ends = np.flatnonzero(last)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    if np.any(ends - starts >= 10):
+        raise DiscretizerException('Varint too long.')
+
+    # position of every byte within its varint
+    value_idx = np.cumsum(last) - last
+    pos = np.arange(raw.size) - starts[value_idx]
+    parts = ((raw & 0x7F).astype(np.uint64) <<
+             (np.uint64(7) * pos.astype(np.uint64)))
+    return np.bitwise_or.reduceat(parts, starts)
+
+
+def _read_header(raw):
+    if raw.size == 0:
+        raise DiscretizerException('Empty compressed stream.')
+    method = _METHOD_NAMES.get(int(raw[0]))
+    if method is None:
+        raise DiscretizerException('Unknown compression method.')
+    ends = np.flatnonzero(raw[1:11] < 0x80)
+    if ends.size == 0:
+        raise DiscretizerException('Truncated compressed stream.')
+    body = 1 + int(ends[0]) + 1
+    count = int(decode_varints(raw[1:body])[0])
+    return method, count, raw[body:]
+
+
+def compress_buckets(bucket_nums, method='delta'):
+    if method not in METHODS:
+        raise DiscretizerException('Unknown compression method.')
+    bucket_nums = np.asarray(bucket_nums, dtype=np.uint64).ravel()
+    header = np.concatenate([[METHODS[method]],
+                             encode_varints([bucket_nums.size])])
+    if method == 'delta':
+        signed = bucket_nums.view(np.int64)
+        deltas = np.diff(signed, prepend=np.int64(0))
+        body = encode_varints(zigzag_encode(deltas))
+    else:
+        starts = np.flatnonzero(np.diff(bucket_nums)) + 1
+        starts = np.concatenate([[0], starts]) if bucket_nums.size else \
+            starts
+        lengths = np.diff(np.append(starts, bucket_nums.size))
+        run_vals = bucket_nums[starts].view(np.int64)
+        deltas = np.diff(run_vals, prepend=np.int64(0))
+        body = np.concatenate([encode_varints([starts.size]),
+                               encode_varints(zigzag_encode(deltas)),
+                               encode_varints(lengths)])
+    return np.concatenate([header.astype(np.uint8), body]).tobytes()
+
+
+def decompress_buckets(data):
+    raw = buffer_to_uint8(data)
+    method, count, body = _read_header(raw)
+    codes = decode_varints(body)
+    if method == 'delta':
+        if codes.size != count:
+            raise DiscretizerException('Invalid number of values.')
+        bucket_nums = np.cumsum(zigzag_decode(codes))
+    else:
+        if codes.size == 0:
+            raise DiscretizerException('Truncated compressed stream.')
+        num_runs = int(codes[0])
+        if codes.size != 1 + 2 * num_runs:
+            raise DiscretizerException('Invalid number of runs.')
+        run_vals = np.cumsum(zigzag_decode(codes[1:1 + num_runs]))
+        lengths = codes[1 + num_runs:].astype(np.int64)
+        if int(lengths.sum()) != count:
+            raise DiscretizerException('Invalid number of values.')
+        bucket_nums = np.repeat(run_vals, lengths)
+    if bucket_nums.size and bucket_nums.min() < 0:
+        raise DiscretizerException('Bucket number must be >= 0.')
+    return bucket_nums.astype(np.uint64)
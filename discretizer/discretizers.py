@@ -1,25 +1,84 @@
+import bisect
+import itertools
 import math
 
+import numpy as np
+
 
 ONE_THIRD = 1.0/3.0
 
+# relative tolerance (in units of machine epsilon) used to detect batch
+# results that sit too close to a rounding boundary to trust numpy's
+# transcendental functions, which may differ from libm by a few ulps
+MAP_TOLERANCE_ULPS = 16.0
+
+# decode lookup tables are built automatically up to this width (65,536
+# buckets) and shared between discretizers with identical parameters
+LOOKUP_TABLE_MAX_BYTES = 2
+LOOKUP_TABLE_CACHE_SIZE = 32
+_decode_tables = {}
+
+# encode engines: 'map' evaluates the mapping function for every value,
+# 'table' bisects a shared table of bucket boundaries (small widths only)
+ENCODE_ENGINES = ('map', 'table')
+_encode_tables = {}
+
+# number of values per chunk for the streaming encoder/decoder
+STREAM_CHUNK_SIZE = 65536
+
+# number of values per chunk when bit-packing, bounds temporary memory
+PACK_CHUNK_SIZE = 65536
+
+# number of samples in the inverse tables of function discretizers, the
+# table brackets each decoded value which is then narrowed down to
+# adjacent floats in at most INVERSE_MAX_STEPS steps on the encoder
+INVERSE_TABLE_SIZE = 65537
+INVERSE_MAX_STEPS = 128
+
+# byte orders of integer bucket arrays
+BYTE_ORDERS = {'big': '>', 'little': '<', 'native': '='}
+
 
 class DiscretizerException(Exception):
     pass
 
 
-class BaseDiscretizer(object):
-    def __init__(self, num_bytes, val_min, val_max):
-        if not isinstance(num_bytes, int):
-            raise DiscretizerException('Number of bytes must be an integer.')
-        if num_bytes <= 0:
-            raise DiscretizerException('Number of bytes must be > 0.')
-        if num_bytes >= 8:
-            raise DiscretizerException('Too many bytes, use a 64-bit double '
+def resolve_width(num_bytes, num_bits):
+    # returns (num_bytes, num_bits), where num_bits defaults to whole bytes
+    # and num_bytes, the scalar record width, may be derived from num_bits
+    if num_bits is not None:
+        if not isinstance(num_bits, int):
+            raise DiscretizerException('Number of bits must be an integer.')
+        if num_bits <= 0:
+            raise DiscretizerException('Number of bits must be > 0.')
+        if num_bits > 56:
+            raise DiscretizerException('Too many bits, use a 64-bit double '
                                        'instead.')
-        self._num_bytes = num_bytes
-        num_bits = 8 * self._num_bytes
-        self._num_buckets = 2 ** num_bits
+        if num_bytes is None:
+            num_bytes = (num_bits + 7) // 8
+    if not isinstance(num_bytes, int):
+        raise DiscretizerException('Number of bytes must be an integer.')
+    if num_bytes <= 0:
+        raise DiscretizerException('Number of bytes must be > 0.')
+    if num_bytes >= 8:
+        raise DiscretizerException('Too many bytes, use a 64-bit double '
+                                   'instead.')
+    if num_bits is None:
+        num_bits = 8 * num_bytes
+    elif num_bytes != (num_bits + 7) // 8:
+        raise DiscretizerException('Number of bytes does not match number '
+                                   'of bits.')
+    return num_bytes, num_bits
+
+
+class BaseDiscretizer(object):
+    # scale of the absolute error of map_encoder_array relative to
+    # map_encoder, subclasses with exact mappings set this to zero
+    _map_err_scale = 1.0
+
+    def __init__(self, num_bytes, val_min, val_max, num_bits=None):
+        self._num_bytes, self._num_bits = resolve_width(num_bytes, num_bits)
+        self._num_buckets = 2 ** self._num_bits
         self._max_bucket = self._num_buckets - 1
         self._max_bucket_float = float(self._max_bucket)
         if not isinstance(val_min, float):
@@ -32,11 +91,29 @@ class BaseDiscretizer(object):
         self._val_max = val_max
         self._val_range = self._val_max - self._val_min
         assert self._val_range > 0.0
+        self._use_lookup_table = self._num_bytes <= LOOKUP_TABLE_MAX_BYTES
+        self._decode_table = None
+        self._encode_engine = 'map'
+        self._encode_table = None
+        self._stats = None
+
+    def __getstate__(self):
+        # shared lookup tables are rebuilt lazily instead of being pickled,
+        # which keeps discretizers cheap to send to worker processes
+        state = self.__dict__.copy()
+        state['_decode_table'] = None
+        state['_encode_table'] = None
+        state['_stats'] = None
+        return state
 
     @property
     def num_bytes(self):
         return self._num_bytes
 
+    @property
+    def num_bits(self):
+        return self._num_bits
+
     @property
     def num_buckets(self):
         return self._num_buckets
@@ -61,25 +138,462 @@ class BaseDiscretizer(object):
     def val_range(self):
         return self._val_range
 
+    @property
+    def lookup_table(self):
+        return self._use_lookup_table
+
+    @property
+    def decode_table(self):
+        if not self._use_lookup_table:
+            return None
+        if self._decode_table is None:
+            self._decode_table = self._shared_decode_table()
+        return self._decode_table[0]
+
+    def use_lookup_table(self, enabled=True):
+        if enabled and self.num_bytes > LOOKUP_TABLE_MAX_BYTES:
+            raise DiscretizerException('Lookup tables are limited to %d '
+                                       'bytes.' % LOOKUP_TABLE_MAX_BYTES)
+        self._use_lookup_table = bool(enabled)
+        self._decode_table = None
+
+    def spec(self):
+        # constructor arguments, enough to rebuild an identical discretizer
+        # with discretizer_from_spec()
+        spec = {'type': type(self).__name__,
+                'num_bytes': self.num_bytes,
+                'val_min': self.val_min,
+                'val_max': self.val_max}
+        if self.num_bits != 8 * self.num_bytes:
+            spec['num_bits'] = self.num_bits
+        return spec
+
+    def mapping_params(self):
+        # extra parameters of the mapping function, beyond the width and
+        # range, that change the bucket to value relationship
+        return ()
+
+    def _table_key(self):
+        return ((type(self), self.num_bits, self.val_min, self.val_max) +
+                tuple(self.mapping_params()))
+
+    def _shared_decode_table(self):
+        return _shared_table(_decode_tables, self, _build_decode_table)
+
+    @property
+    def encode_engine(self):
+        return self._encode_engine
+
+    @property
+    def bucket_edges(self):
+        # bucket_edges[i] is the smallest value encoded to bucket i + 1
+        if self._encode_engine != 'table':
+            return None
+        if self._encode_table is None:
+            self._encode_table = self._shared_encode_table()
+        return self._encode_table[0]
+
+    def use_encode_engine(self, engine):
+        if engine not in ENCODE_ENGINES:
+            raise DiscretizerException('Unknown encode engine.')
+        if engine == 'table' and self.num_bytes > LOOKUP_TABLE_MAX_BYTES:
+            raise DiscretizerException('Lookup tables are limited to %d '
+                                       'bytes.' % LOOKUP_TABLE_MAX_BYTES)
+        self._encode_engine = engine
+        self._encode_table = None
+
+    def _shared_encode_table(self):
+        return _shared_table(_encode_tables, self, _build_encode_table)
+
+    def _encode_bucket_num(self, val):
+        if self._encode_engine == 'map':
+            return self.val_to_bucket_num(val)
+        if not isinstance(val, float):
+            raise DiscretizerException('Value must be a float.')
+        if val != val:
+            # NaN fails exactly as it does in the mapping function
+            return self.val_to_bucket_num(val)
+        if self._encode_table is None:
+            self._encode_table = self._shared_encode_table()
+        return bisect.bisect_right(self._encode_table[1], val)
+
+    def _encode_bucket_nums(self, vals):
+        if self._encode_engine == 'map':
+            return self.vals_to_bucket_nums(vals)
+        vals = np.asarray(vals)
+        if vals.dtype.kind != 'f':
+            raise DiscretizerException('Values must be floats.')
+        vals = vals.ravel()
+        if np.isnan(vals).any():
+            raise DiscretizerException('Values must not be NaN.')
+        bucket_nums = np.searchsorted(self.bucket_edges, vals, side='right')
+        return bucket_nums.astype(np.uint64)
+
+    @property
+    def stats(self):
+        return self._stats
+
+    def enable_stats(self, histogram=True, timing=True):
+        # counters are kept until disable_stats() or stats.reset()
+        from .stats import DiscretizerStats
+        self._stats = DiscretizerStats(self, histogram, timing)
+        return self._stats
+
+    def disable_stats(self):
+        self._stats = None
+
     def encode(self, val):
-        bucket_num = self.val_to_bucket_num(val)
-        ba = self.bucket_num_to_bytearray(bucket_num)
-        len_ba = len(ba)
-        if len_ba != self.num_bytes:
-            ba.reverse()
-            for i in range(self.num_bytes - len_ba):
-                ba.append(0)
-            ba.reverse()
-        return ba
+        if self._stats is not None:
+            return self._stats.encode(self, val)
+        bucket_num = self._encode_bucket_num(val)
+        return self._pack_bucket_num(bucket_num)
 
     def decode(self, ba):
         if not isinstance(ba, bytearray):
             raise DiscretizerException('Input not bytearray.')
         if len(ba) != self.num_bytes:
             raise DiscretizerException('Invalid number of bytes parsed.')
-        bucket_num = self.bytearray_to_bucket_num(ba)
+        bucket_num = self._unpack_bucket_num(ba)
+        if bucket_num > self._max_bucket:
+            raise DiscretizerException('Bucket number must be <= maximum.')
+        if self._stats is not None:
+            return self._stats.decode(self, bucket_num)
+        if self._use_lookup_table:
+            if self._decode_table is None:
+                self._decode_table = self._shared_decode_table()
+            return self._decode_table[1][bucket_num]
+        return self.bucket_num_to_val(bucket_num)
+
+    def _decode_bucket_num(self, bucket_num):
+        if self._use_lookup_table:
+            if self._decode_table is None:
+                self._decode_table = self._shared_decode_table()
+            return self._decode_table[1][bucket_num]
         return self.bucket_num_to_val(bucket_num)
 
+    def fast_codec(self, validate=True):
+        # returns an (encode, decode) pair of plain functions equivalent to
+        # encode()/decode() with every constant bound up front, for callers
+        # that process values one at a time; validate=False also drops the
+        # type, NaN and length checks, stats are never recorded
+        check = bool(validate)
+        num_bytes = self._num_bytes
+        max_bucket = self._max_bucket
+        max_bucket_float = self._max_bucket_float
+        val_min = self._val_min
+        val_max = self._val_max
+        val_range = self._val_range
+        to_bytes = int.to_bytes
+        from_bytes = int.from_bytes
+        bisect_right = bisect.bisect_right
+        map_encoder, map_decoder = self._scalar_mappers()
+        edges = self._scalar_edges()
+        values = self._scalar_values()
+
+        def check_val(val):
+            if not isinstance(val, float):
+                raise DiscretizerException('Value must be a float.')
+            if val != val:
+                raise DiscretizerException('Value must not be NaN.')
+
+        def check_ba(ba):
+            if not isinstance(ba, bytearray):
+                raise DiscretizerException('Input not bytearray.')
+            if len(ba) != num_bytes:
+                raise DiscretizerException('Invalid number of bytes parsed.')
+
+        if edges is not None:
+            def encode(val):
+                if check:
+                    check_val(val)
+                return bytearray(to_bytes(bisect_right(edges, val),
+                                          num_bytes, 'big'))
+        elif map_encoder is None:
+            def encode(val):
+                if check:
+                    check_val(val)
+                v = (val - val_min) / val_range
+                if v <= 0.0:
+                    b = 0
+                elif v >= 1.0:
+                    b = max_bucket
+                else:
+                    b = int(round(v * max_bucket))
+                return bytearray(to_bytes(b, num_bytes, 'big'))
+        else:
+            def encode(val):
+                if check:
+                    check_val(val)
+                v = (val - val_min) / val_range
+                if v <= 0.0:
+                    b = 0
+                elif v >= 1.0:
+                    b = max_bucket
+                else:
+                    b = int(round(map_encoder(v) * max_bucket))
+                    if b < 0:
+                        b = 0
+                    elif b > max_bucket:
+                        b = max_bucket
+                return bytearray(to_bytes(b, num_bytes, 'big'))
+
+        if values is not None:
+            def decode(ba):
+                if check:
+                    check_ba(ba)
+                b = from_bytes(ba, 'big')
+                if check and b > max_bucket:
+                    raise DiscretizerException('Bucket number must be <= '
+                                               'maximum.')
+                return values[b]
+        else:
+            def decode(ba):
+                if check:
+                    check_ba(ba)
+                b = from_bytes(ba, 'big')
+                if check and b > max_bucket:
+                    raise DiscretizerException('Bucket number must be <= '
+                                               'maximum.')
+                b = b / max_bucket_float
+                if b <= 0.0:
+                    return val_min
+                elif b >= 1.0:
+                    return val_max
+                v = b if map_decoder is None else map_decoder(b)
+                if v <= 0.0:
+                    return val_min
+                elif v >= 1.0:
+                    return val_max
+                return val_min + v * val_range
+
+        return encode, decode
+
+    def _scalar_mappers(self):
+        # plain functions for the mapping, None for the identity
+        return self.map_encoder, self.map_decoder
+
+    def _libm_encoder_array(self, v):
+        # map_encoder() over an array with bit-identical results, numpy's
+        # own transcendental functions may differ from libm in the last ulp
+        map_encoder = self._scalar_mappers()[0]
+        if map_encoder is None:
+            return v
+        return np.fromiter(map(map_encoder, v.tolist()), np.float64, v.size)
+
+    def _libm_decoder_array(self, b):
+        # map_decoder() over an array with bit-identical results
+        map_decoder = self._scalar_mappers()[1]
+        if map_decoder is None:
+            return b
+        return np.fromiter(map(map_decoder, b.tolist()), np.float64, b.size)
+
+    def _scalar_edges(self):
+        if self._encode_engine != 'table':
+            return None
+        if self._encode_table is None:
+            self._encode_table = self._shared_encode_table()
+        return self._encode_table[1]
+
+    def _scalar_values(self):
+        if not self._use_lookup_table:
+            return None
+        if self._decode_table is None:
+            self._decode_table = self._shared_decode_table()
+        return self._decode_table[1]
+
+    def _pack_bucket_num(self, bucket_num):
+        # fixed width big-endian packing, equivalent to
+        # bucket_num_to_bytearray() padded to num_bytes
+        return bytearray(bucket_num.to_bytes(self._num_bytes, 'big'))
+
+    def _unpack_bucket_num(self, ba):
+        return int.from_bytes(ba, 'big')
+
+    def encode_array(self, vals, workers=None):
+        if self._stats is not None:
+            return self._stats.encode_array(self, vals, workers)
+        return self._encode_array(vals, workers)
+
+    def _encode_array(self, vals, workers):
+        if workers is not None:
+            if not isinstance(workers, int) or workers <= 0:
+                raise DiscretizerException('Number of workers must be an '
+                                           'integer > 0.')
+            if workers > 1:
+                from .parallel import parallel_encode_array
+                return parallel_encode_array(self, vals, workers)
+        bucket_nums = self._encode_bucket_nums(vals)
+        return buckets_to_buffer(bucket_nums, self.num_bytes)
+
+    def decode_array(self, buf):
+        if self._stats is not None:
+            return self._stats.decode_array(self, buf)
+        return self._decode_array(buf)
+
+    def _decode_array(self, buf):
+        bucket_nums = buffer_to_buckets(buf, self.num_bytes)
+        if (self.num_bits % 8 and bucket_nums.size and
+                int(bucket_nums.max()) > self.max_bucket):
+            raise DiscretizerException('Bucket number must be <= maximum.')
+        table = self.decode_table
+        if table is not None:
+            return table[bucket_nums]
+        return self._bucket_nums_to_vals(bucket_nums)
+
+    def int_dtype(self, byteorder='native'):
+        # unsigned integer type holding one bucket number, 3 byte widths
+        # widen to uint32 and 5-7 byte widths to uint64
+        if byteorder not in BYTE_ORDERS:
+            raise DiscretizerException('Unknown byte order.')
+        size = 1
+        while size < self.num_bytes:
+            size *= 2
+        return np.dtype('%su%d' % (BYTE_ORDERS[byteorder], size))
+
+    def encode_ints(self, vals, byteorder='native'):
+        # bucket numbers as an integer array, skipping the byte packing
+        bucket_nums = self._encode_bucket_nums(vals)
+        return bucket_nums.astype(self.int_dtype(byteorder))
+
+    def decode_ints(self, ints):
+        return self.bucket_nums_to_vals(ints)
+
+    def buffer_to_ints(self, buf, byteorder='big'):
+        # packed records as an integer array, a zero-copy view for 1, 2 and
+        # 4 byte widths in big-endian order and a converted copy otherwise
+        dtype = self.int_dtype(byteorder)
+        if (self.num_bytes == dtype.itemsize and
+                dtype == dtype.newbyteorder('>')):
+            raw = buffer_to_uint8(buf, self.num_bytes).reshape(-1)
+            return raw.view(dtype)
+        return buffer_to_buckets(buf, self.num_bytes).astype(dtype)
+
+    def ints_to_buffer(self, ints):
+        # packed records from an integer array, a zero-copy view of
+        # contiguous big-endian arrays of the exact width
+        ints = np.asarray(ints)
+        if ints.dtype.kind not in 'iu':
+            raise DiscretizerException('Bucket numbers must be integers.')
+        ints = ints.reshape(-1)
+        if ints.size:
+            if ints.dtype.kind == 'i' and ints.min() < 0:
+                raise DiscretizerException('Bucket number must be >= 0.')
+            if int(ints.max()) > self.max_bucket:
+                raise DiscretizerException('Bucket number must be <= '
+                                           'maximum.')
+        dtype = self.int_dtype('big')
+        if self.num_bytes == dtype.itemsize:
+            packed = np.ascontiguousarray(ints.astype(dtype, copy=False))
+            return packed.view(np.uint8)
+        return buckets_to_buffer(ints, self.num_bytes)
+
+    def packed_size(self, count):
+        return (count * self.num_bits + 7) // 8
+
+    def encode_packed(self, vals):
+        # densely bit-packed batch, num_bits per value, big-endian bit order
+        bucket_nums = self._encode_bucket_nums(vals)
+        return pack_bits(bucket_nums, self.num_bits)
+
+    def decode_packed(self, buf, count=None):
+        bucket_nums = unpack_bits(buf, self.num_bits, count)
+        table = self.decode_table
+        if table is not None:
+            return table[bucket_nums]
+        return self._bucket_nums_to_vals(bucket_nums)
+
+    def bucket_bounds(self, lo=None, hi=None, conservative=True):
+        # bucket numbers [b_lo, b_hi] for the predicate lo <= x <= hi, the
+        # mappings are monotonic so bucket order follows value order;
+        # conservative bounds include every bucket that may hold a matching
+        # value, otherwise only buckets holding nothing but matching values
+        # are included (b_lo > b_hi when there are none)
+        for bound in (lo, hi):
+            if bound is not None and not isinstance(bound, float):
+                raise DiscretizerException('Bounds must be floats.')
+            if bound is not None and bound != bound:
+                raise DiscretizerException('Bounds must not be NaN.')
+        if lo is not None and hi is not None and lo > hi:
+            raise DiscretizerException('Lower bound above upper bound.')
+        if lo == -math.inf:
+            lo = None
+        if hi == math.inf:
+            hi = None
+        b_lo = 0
+        b_hi = self.max_bucket
+        if lo is not None:
+            b_lo = self._encode_bucket_num(lo)
+            if not conservative:
+                below = self._encode_bucket_num(math.nextafter(lo, -math.inf))
+                if below == b_lo:
+                    b_lo += 1
+        if hi is not None:
+            b_hi = self._encode_bucket_num(hi)
+            if not conservative:
+                above = self._encode_bucket_num(math.nextafter(hi, math.inf))
+                if above == b_hi:
+                    b_hi -= 1
+        return b_lo, b_hi
+
+    def filter_range(self, buf, lo=None, hi=None, conservative=True):
+        # boolean mask over the packed records of buf, compared as bucket
+        # numbers without decoding any values
+        b_lo, b_hi = self.bucket_bounds(lo, hi, conservative)
+        bucket_nums = buffer_to_buckets(buf, self.num_bytes)
+        if b_lo > b_hi:
+            return np.zeros(bucket_nums.size, dtype=bool)
+        return ((bucket_nums >= np.uint64(b_lo)) &
+                (bucket_nums <= np.uint64(b_hi)))
+
+    def encode_compressed(self, vals, method='delta'):
+        # lossless delta/run-length coding of the bucket numbers, see
+        # discretizer.compression
+        from .compression import compress_buckets
+        return compress_buckets(self._encode_bucket_nums(vals), method)
+
+    def decode_compressed(self, data):
+        from .compression import decompress_buckets
+        return self.bucket_nums_to_vals(decompress_buckets(data))
+
+    def encode_stream(self, vals, chunk_size=STREAM_CHUNK_SIZE):
+        # yields packed bytes for at most chunk_size values at a time
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise DiscretizerException('Chunk size must be an integer > 0.')
+        if isinstance(vals, np.ndarray):
+            vals = vals.ravel()
+            for i in range(0, vals.size, chunk_size):
+                yield self.encode_array(vals[i:i + chunk_size]).tobytes()
+            return
+        it = iter(vals)
+        while True:
+            # no conversion, ints and other items fail the float check of
+            # encode_array() as they would in an array
+            chunk = np.asarray(list(itertools.islice(it, chunk_size)))
+            if chunk.size == 0:
+                return
+            yield self.encode_array(chunk).tobytes()
+
+    def decode_stream(self, f, chunk_size=STREAM_CHUNK_SIZE):
+        # reads fixed width records from a file-like object and yields
+        # arrays of at most chunk_size values
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise DiscretizerException('Chunk size must be an integer > 0.')
+        read_size = chunk_size * self.num_bytes
+        while True:
+            # file-like objects such as pipes may return short reads
+            pending = bytearray()
+            while len(pending) < read_size:
+                data = f.read(read_size - len(pending))
+                if not data:
+                    break
+                pending += data
+            if len(pending) % self.num_bytes != 0:
+                raise DiscretizerException('Stream ended inside a record.')
+            if pending:
+                yield self.decode_array(pending)
+            if len(pending) < read_size:
+                return
+
     def val_to_bucket_num(self, val):
         if not isinstance(val, float):
             raise DiscretizerException('Value must be a float.')
@@ -102,6 +616,121 @@ class BaseDiscretizer(object):
             bucket_num = self.max_bucket
         return bucket_num
 
+    def vals_to_bucket_nums(self, vals):
+        vals = np.asarray(vals)
+        if vals.dtype.kind != 'f':
+            raise DiscretizerException('Values must be floats.')
+        vals = vals.astype(np.float64, copy=False).ravel()
+        if np.isnan(vals).any():
+            raise DiscretizerException('Values must not be NaN.')
+
+        # normalise the input values, in-range values are mapped below
+        v = (vals - self.val_min) / self.val_range
+        bucket_nums = np.zeros(v.shape, dtype=np.uint64)
+        bucket_nums[v >= 1.0] = self.max_bucket
+        inside = np.flatnonzero((v > 0.0) & (v < 1.0))
+        if inside.size == 0:
+            return bucket_nums
+
+        # values close to a rounding boundary may round differently than
+        # libm would, so those are recomputed with the scalar mapping; when
+        # the tolerance reaches half a bucket (6-7 byte widths) that is
+        # every value and the vectorized mapping is skipped
+        tol = (MAP_TOLERANCE_ULPS * np.finfo(np.float64).eps *
+               self.max_bucket_float * self._map_err_scale)
+        if tol >= 0.5:
+            bucket_nums[inside] = self._scalar_bucket_nums(v[inside])
+            return bucket_nums
+
+        # execute mapping function, get nearest bucket number and clamp
+        scaled = self.map_encoder_array(v[inside]) * self.max_bucket_float
+        rounded = np.clip(np.rint(scaled), 0.0, self.max_bucket_float)
+        bucket_nums[inside] = rounded.astype(np.uint64)
+        if self.max_bucket > 2 ** 53:
+            # floats above 2^53 lose integer precision, clamp in integers
+            np.minimum(bucket_nums, np.uint64(self.max_bucket),
+                       out=bucket_nums)
+
+        if tol > 0.0:
+            frac = scaled - np.floor(scaled)
+            unsure = inside[np.flatnonzero(np.abs(frac - 0.5) <= tol)]
+            if unsure.size:
+                bucket_nums[unsure] = self._scalar_bucket_nums(v[unsure])
+        return bucket_nums
+
+    def _scalar_bucket_nums(self, v):
+        # val_to_bucket_num() for normalised values inside (0, 1): the same
+        # libm mapping, then the identical multiply, round half to even and
+        # clamp vectorized
+        b = self._libm_encoder_array(v)
+        rounded = np.clip(np.rint(b * self.max_bucket_float), 0.0,
+                          self.max_bucket_float).astype(np.uint64)
+        return np.minimum(rounded, np.uint64(self.max_bucket))
+
+    def bucket_nums_to_vals(self, bucket_nums):
+        bucket_nums = np.asarray(bucket_nums)
+        if bucket_nums.dtype.kind not in 'iu':
+            raise DiscretizerException('Bucket numbers must be integers.')
+        bucket_nums = bucket_nums.ravel()
+        if bucket_nums.size == 0:
+            return np.zeros(0, dtype=np.float64)
+        if bucket_nums.dtype.kind == 'i' and bucket_nums.min() < 0:
+            raise DiscretizerException('Bucket number must be >= 0.')
+        if int(bucket_nums.max()) > self.max_bucket:
+            raise DiscretizerException('Bucket number must be <= maximum.')
+        table = self.decode_table
+        if table is not None:
+            return table[bucket_nums]
+        return self._bucket_nums_to_vals(bucket_nums)
+
+    def _bucket_nums_to_vals(self, bucket_nums, map_decoder_array=None):
+        # compute bucket factors, bucket 0 and the maximum are exact bounds
+        b = bucket_nums.astype(np.float64) / self.max_bucket_float
+        vals = np.empty(b.shape, dtype=np.float64)
+        vals[b <= 0.0] = self.val_min
+        vals[b >= 1.0] = self.val_max
+        inside = np.flatnonzero((b > 0.0) & (b < 1.0))
+        if inside.size == 0:
+            return vals
+
+        # execute mapping function, clamp and compute values
+        if map_decoder_array is None:
+            map_decoder_array = self.map_decoder_array
+        v = map_decoder_array(b[inside])
+        local = self.val_min + v * self.val_range
+        local[v <= 0.0] = self.val_min
+        local[v >= 1.0] = self.val_max
+        vals[inside] = local
+        return vals
+
+    def bucket_ranges(self, bucket_nums):
+        # value interval [lo, hi] covered by each bucket, the outer buckets
+        # are limited to [val_min, val_max] as clamped values are unbounded
+        bucket_nums = np.asarray(bucket_nums)
+        if bucket_nums.dtype.kind not in 'iu':
+            raise DiscretizerException('Bucket numbers must be integers.')
+        bucket_nums = bucket_nums.ravel()
+        if bucket_nums.size == 0:
+            return np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.float64)
+        if bucket_nums.dtype.kind == 'i' and bucket_nums.min() < 0:
+            raise DiscretizerException('Bucket number must be >= 0.')
+        if int(bucket_nums.max()) > self.max_bucket:
+            raise DiscretizerException('Bucket number must be <= maximum.')
+        return self._bucket_ranges(bucket_nums)
+
+    def _bucket_ranges(self, bucket_nums):
+        # buckets are rounded, so their edges sit half a bucket either side
+        b = bucket_nums.astype(np.float64)
+        ranges = []
+        for edge in (b - 0.5, b + 0.5):
+            edge = np.clip(edge / self.max_bucket_float, 0.0, 1.0)
+            v = edge.copy()
+            inside = np.flatnonzero((edge > 0.0) & (edge < 1.0))
+            v[inside] = np.clip(self.map_decoder_array(edge[inside]), 0.0,
+                                1.0)
+            ranges.append(self.val_min + v * self.val_range)
+        return ranges[0], ranges[1]
+
     def bucket_num_to_val(self, bucket_num):
         if not isinstance(bucket_num, int):
             raise DiscretizerException('Bucket number must be an integer.')
@@ -199,9 +828,172 @@ class BaseDiscretizer(object):
         return ba
 
 
+def _shared_table(cache, d, builder):
+    key = d._table_key()
+    tables = cache.get(key)
+    if tables is None:
+        table = builder(d)
+        table.flags.writeable = False
+        tables = (table, table.tolist())
+        if len(cache) >= LOOKUP_TABLE_CACHE_SIZE:
+            del cache[next(iter(cache))]
+        cache[key] = tables
+    return tables
+
+
+def _build_decode_table(d):
+    # values of the scalar decoder, so decode() through the table returns
+    # exactly what bucket_num_to_val() does
+    buckets = np.arange(d.num_buckets, dtype=np.uint64)
+    return d._bucket_nums_to_vals(buckets, d._libm_decoder_array)
+
+
+def _float_to_ordinal(x):
+    # map floats onto integers with the same ordering, adjacent floats
+    # have adjacent ordinals
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return np.where(bits < 0, -(bits & np.int64(0x7FFFFFFFFFFFFFFF)), bits)
+
+
+def _ordinal_to_float(o):
+    o = np.asarray(o, dtype=np.int64)
+    bits = np.where(o < 0, (-o) | np.int64(-0x8000000000000000), o)
+    return bits.view(np.float64)
+
+
+def _build_encode_table(d):
+    # find, for every bucket j > 0, the smallest value encoded to bucket j
+    # or above, by bisecting the ordered floats between an initial guess
+    # from the decoder and its neighbours
+    j = np.arange(1, d.num_buckets, dtype=np.uint64)
+    b = (j.astype(np.float64) - 0.5) / d.max_bucket_float
+    guess = d.val_min + d.map_decoder_array(b) * d.val_range
+    guess = np.clip(guess, d.val_min, d.val_max)
+    ord_min = int(_float_to_ordinal(d.val_min))
+    ord_max = int(_float_to_ordinal(d.val_max))
+
+    def at_or_above(ords, targets):
+        return d.vals_to_bucket_nums(_ordinal_to_float(ords)) >= targets
+
+    # bracket each edge, bucket(lo) < j <= bucket(hi)
+    start = _float_to_ordinal(guess)
+    above = at_or_above(start, j)
+    lo = np.where(above, ord_min, start)
+    hi = np.where(above, start, ord_max)
+    step = 1
+    pending = np.arange(j.size)
+    while pending.size:
+        down = above[pending]
+        probe = np.where(down, start[pending] - step, start[pending] + step)
+        probe = np.clip(probe, ord_min, ord_max)
+        hit = at_or_above(probe, j[pending])
+        lo[pending] = np.where(hit, lo[pending], probe)
+        hi[pending] = np.where(hit, probe, hi[pending])
+        pending = pending[np.where(down, hit, ~hit)]
+        step *= 2
+
+    # bisect down to adjacent floats
+    pending = np.flatnonzero(hi - lo > 1)
+    while pending.size:
+        mid = lo[pending] + (hi[pending] - lo[pending]) // 2
+        hit = at_or_above(mid, j[pending])
+        hi[pending] = np.where(hit, mid, hi[pending])
+        lo[pending] = np.where(hit, lo[pending], mid)
+        pending = pending[hi[pending] - lo[pending] > 1]
+    return _ordinal_to_float(hi)
+
+
+def pack_bits(bucket_nums, num_bits, chunk_size=PACK_CHUNK_SIZE):
+    # stores the low num_bits of every bucket number back to back, most
+    # significant bit first, in ceil(count * num_bits / 8) bytes
+    bucket_nums = np.asarray(bucket_nums, dtype=np.uint64).ravel()
+    count = bucket_nums.size
+    out = np.empty((count * num_bits + 7) // 8, dtype=np.uint8)
+    # chunks hold a multiple of 8 values so they start on byte boundaries
+    chunk_size -= chunk_size % 8
+    for start in range(0, count, chunk_size):
+        chunk = bucket_nums[start:start + chunk_size]
+        bits = np.unpackbits(chunk.astype('>u8').view(np.uint8)
+                             .reshape(-1, 8), axis=1)[:, 64 - num_bits:]
+        packed = np.packbits(bits.ravel())
+        offset = start * num_bits // 8
+        out[offset:offset + packed.size] = packed
+    return out
+
+
+def unpack_bits(buf, num_bits, count=None, chunk_size=PACK_CHUNK_SIZE):
+    raw = buffer_to_uint8(buf)
+    if count is None:
+        # below 8 bits the padding of the last byte may hold whole values,
+        # so the count cannot be told from the size
+        if num_bits < 8 and raw.size:
+            raise DiscretizerException('Count is required below 8 bits per '
+                                       'value.')
+        count = raw.size * 8 // num_bits
+    if not isinstance(count, (int, np.integer)) or count < 0:
+        raise DiscretizerException('Count must be an integer >= 0.')
+    if (count * num_bits + 7) // 8 != raw.size:
+        raise DiscretizerException('Invalid number of bytes parsed.')
+    out = np.empty(count, dtype=np.uint64)
+    chunk_size -= chunk_size % 8
+    for start in range(0, count, chunk_size):
+        n = min(chunk_size, count - start)
+        offset = start * num_bits // 8
+        bits = np.unpackbits(raw[offset:offset + (n * num_bits + 7) // 8],
+                             count=n * num_bits)
+        wide = np.zeros((n, 64), dtype=np.uint8)
+        wide[:, 64 - num_bits:] = bits.reshape(n, num_bits)
+        out[start:start + n] = np.packbits(wide, axis=1).view('>u8').ravel()
+    return out
+
+
+def buckets_to_buffer(bucket_nums, num_bytes):
+    # pack bucket numbers as fixed width big-endian records
+    bucket_nums = np.asarray(bucket_nums, dtype=np.uint64).ravel()
+    wide = bucket_nums.astype('>u8').view(np.uint8).reshape(-1, 8)
+    return np.ascontiguousarray(wide[:, 8 - num_bytes:]).ravel()
+
+
+def buffer_to_uint8(buf, record_size=None):
+    # packed bytes as a uint8 array without copying, from a uint8 numpy
+    # array or any object supporting the buffer protocol; flat, or
+    # (records, record_size) when a record size is given
+    if isinstance(buf, np.ndarray):
+        if buf.dtype != np.uint8:
+            raise DiscretizerException('Input array must be of type uint8.')
+        raw = buf
+    else:
+        try:
+            raw = np.frombuffer(buf, dtype=np.uint8)
+        except TypeError:
+            raise DiscretizerException('Input not a buffer.')
+    if record_size is None:
+        return raw.ravel()
+    if raw.ndim == 2 and raw.shape[1] == record_size:
+        # record arrays are kept as they are, strided views included
+        return raw
+    raw = raw.ravel()
+    if raw.size % record_size != 0:
+        raise DiscretizerException('Invalid number of bytes parsed.')
+    return raw.reshape(-1, record_size)
+
+
+def buffer_to_buckets(buf, num_bytes):
+    raw = buffer_to_uint8(buf, num_bytes).ravel()
+    if num_bytes in (1, 2, 4):
+        # native widths, reinterpret the big-endian records directly
+        return raw.view('>u%d' % num_bytes).astype(np.uint64)
+    wide = np.zeros((raw.size // num_bytes, 8), dtype=np.uint8)
+    wide[:, 8 - num_bytes:] = raw.reshape(-1, num_bytes)
+    return wide.view('>u8').ravel().astype(np.uint64)
+
+
 class LinearDiscretizer(BaseDiscretizer):
-    def __init__(self, num_bytes, val_min, val_max):
-        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max)
+    # the identity mapping is exact, no boundary checks are needed
+    _map_err_scale = 0.0
+
+    def __init__(self, num_bytes, val_min, val_max, num_bits=None):
+        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max, num_bits)
 
     def map_encoder(self, v):
         return v
@@ -209,10 +1001,19 @@ class LinearDiscretizer(BaseDiscretizer):
     def map_decoder(self, b):
         return b
 
+    def map_encoder_array(self, v):
+        return v
+
+    def map_decoder_array(self, b):
+        return b
+
+    def _scalar_mappers(self):
+        return None, None
+
 
 class CubeRootDiscretizer(BaseDiscretizer):
-    def __init__(self, num_bytes, val_min, val_max):
-        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max)
+    def __init__(self, num_bytes, val_min, val_max, num_bits=None):
+        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max, num_bits)
 
     def map_encoder(self, v):
         # compute only the real cube root
@@ -224,10 +1025,40 @@ class CubeRootDiscretizer(BaseDiscretizer):
         v = 4.0 * math.pow(b - 0.5, 3.0) + 0.5
         return v
 
+    def _scalar_mappers(self):
+        pow = math.pow
+
+        def map_encoder(v):
+            x = (v - 0.5) * 0.25
+            if x < 0.0:
+                return 0.5 - pow(-x, ONE_THIRD)
+            return pow(x, ONE_THIRD) + 0.5
+
+        def map_decoder(b):
+            return 4.0 * pow(b - 0.5, 3.0) + 0.5
+
+        return map_encoder, map_decoder
+
+    def map_encoder_array(self, v):
+        x = (v - 0.5) * 0.25
+        b = np.copysign(np.power(np.abs(x), ONE_THIRD), x) + 0.5
+        return b
+
+    def _libm_encoder_array(self, v):
+        # only the root goes through libm, 0.5 - p equals -p + 0.5 exactly
+        x = (v - 0.5) * 0.25
+        p = np.fromiter(map(math.pow, np.abs(x).tolist(),
+                            itertools.repeat(ONE_THIRD)), np.float64, x.size)
+        return np.where(x < 0.0, 0.5 - p, p + 0.5)
+
+    def map_decoder_array(self, b):
+        v = 4.0 * np.power(b - 0.5, 3.0) + 0.5
+        return v
+
 
 class SigmoidDiscretizer(BaseDiscretizer):
-    def __init__(self, num_bytes, val_min, val_max, sharpness):
-        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max)
+    def __init__(self, num_bytes, val_min, val_max, sharpness, num_bits=None):
+        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max, num_bits)
         if not isinstance(sharpness, float):
             raise DiscretizerException('Sharpness must be a float.')
         if sharpness <= 0.0:
@@ -237,6 +1068,19 @@ class SigmoidDiscretizer(BaseDiscretizer):
         self._S = 2.0 / (math.exp(0.5*self._k) - 1.0)
         self._one_plus_S = 1.0 + self._S
         self._half_S = 0.5 * self._S
+        self._map_err_scale = self._one_plus_S
+
+    @property
+    def sharpness(self):
+        return self._k
+
+    def spec(self):
+        spec = BaseDiscretizer.spec(self)
+        spec['sharpness'] = self._k
+        return spec
+
+    def mapping_params(self):
+        return (self._k,)
 
     def map_encoder(self, v):
         f = 1.0 + math.exp(self._k * (0.5 - v))
@@ -247,3 +1091,284 @@ class SigmoidDiscretizer(BaseDiscretizer):
         f = self._one_plus_S / (b + self._half_S) - 1.0
         v = 0.5 - self._inv_k * math.log(f)
         return v
+
+    def _scalar_mappers(self):
+        exp = math.exp
+        log = math.log
+        k = self._k
+        inv_k = self._inv_k
+        one_plus_S = self._one_plus_S
+        half_S = self._half_S
+
+        def map_encoder(v):
+            return one_plus_S / (1.0 + exp(k * (0.5 - v))) - half_S
+
+        def map_decoder(b):
+            return 0.5 - inv_k * log(one_plus_S / (b + half_S) - 1.0)
+
+        return map_encoder, map_decoder
+
+    def map_encoder_array(self, v):
+        f = 1.0 + np.exp(self._k * (0.5 - v))
+        b = self._one_plus_S / f - self._half_S
+        return b
+
+    def _libm_encoder_array(self, v):
+        e = np.fromiter(map(math.exp, (self._k * (0.5 - v)).tolist()),
+                        np.float64, v.size)
+        return self._one_plus_S / (1.0 + e) - self._half_S
+
+    def map_decoder_array(self, b):
+        f = self._one_plus_S / (b + self._half_S) - 1.0
+        v = 0.5 - self._inv_k * np.log(f)
+        return v
+
+
+class FunctionDiscretizer(BaseDiscretizer):
+    # custom mapping from a vectorizable, strictly increasing function on
+    # [0, 1], rescaled to map 0 -> 0 and 1 -> 1; the decoder brackets the
+    # inverse with a table sampled from the function once per instance and
+    # solves inside the bracket until its ends are adjacent floats
+    def __init__(self, num_bytes, val_min, val_max, encoder, num_bits=None):
+        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max, num_bits)
+        if not callable(encoder):
+            raise DiscretizerException('Encoder must be callable.')
+        self._func = encoder
+        grid = np.linspace(0.0, 1.0, INVERSE_TABLE_SIZE)
+        try:
+            f = np.asarray(encoder(grid), dtype=np.float64)
+        except (TypeError, ValueError):
+            raise DiscretizerException('Encoder must accept numpy arrays.')
+        if f.shape != grid.shape or not np.isfinite(f).all():
+            raise DiscretizerException('Encoder must return a finite value '
+                                       'per input.')
+        if np.any(np.diff(f) <= 0.0):
+            raise DiscretizerException('Encoder must be strictly increasing '
+                                       'on [0, 1].')
+        self._f0 = float(f[0])
+        self._inv_span = 1.0 / (float(f[-1]) - self._f0)
+        # rescaling amplifies rounding errors of large function values
+        self._map_err_scale = max(1.0, (abs(f[0]) + abs(f[-1])) *
+                                  self._inv_span)
+        b = (f - self._f0) * self._inv_span
+        b[-1] = 1.0
+        b.flags.writeable = False
+        grid.flags.writeable = False
+        self._inverse_b = b
+        self._inverse_v = grid
+        self._inverse_b_list = b.tolist()
+        self._inverse_v_list = grid.tolist()
+
+    @property
+    def encoder(self):
+        return self._func
+
+    def spec(self):
+        raise DiscretizerException('Function discretizers have no '
+                                   'specification.')
+
+    def mapping_params(self):
+        return (self._func,)
+
+    def map_encoder(self, v):
+        return (float(self._func(v)) - self._f0) * self._inv_span
+
+    def map_decoder(self, b):
+        # the array solver, so scalar and batch decoding agree exactly
+        return float(self.map_decoder_array(np.array([b]))[0])
+
+    def _libm_decoder_array(self, b):
+        return self.map_decoder_array(b)
+
+    def map_encoder_array(self, v):
+        return (np.asarray(self._func(v), dtype=np.float64) - self._f0) * \
+            self._inv_span
+
+    def map_decoder_array(self, b):
+        b = np.asarray(b, dtype=np.float64)
+        shape = b.shape
+        b = b.ravel()
+        bs, vs = self._inverse_b, self._inverse_v
+        i = np.clip(np.searchsorted(bs, b, side='right'), 1, bs.size - 1)
+        # bracket f(lo) <= b <= f(hi) with lo, hi >= 0, whose float bits
+        # order like the values
+        lo, hi = vs[i - 1].view(np.int64), vs[i].view(np.int64)
+        f_lo, f_hi = bs[i - 1], bs[i]
+        halved = np.ones(b.size, dtype=bool)
+        for _ in range(INVERSE_MAX_STEPS):
+            active = np.flatnonzero((hi - lo > 1) & (f_lo < b) & (f_hi > b))
+            if active.size == 0:
+                break
+            a_lo, a_hi = lo[active], hi[active]
+            a_b, a_f_lo, a_f_hi = b[active], f_lo[active], f_hi[active]
+            v_lo = a_lo.view(np.float64)
+            v_hi = a_hi.view(np.float64)
+            # secant steps, bisecting the bits after one that failed to
+            # halve the bracket
+            v = v_lo + (v_hi - v_lo) * (a_b - a_f_lo) / (a_f_hi - a_f_lo)
+            probe = np.where(halved[active], v.view(np.int64),
+                             a_lo + (a_hi - a_lo) // 2)
+            probe = np.clip(probe, a_lo + 1, a_hi - 1)
+            f = self.map_encoder_array(probe.view(np.float64))
+            below = f < a_b
+            lo[active] = np.where(below, probe, a_lo)
+            f_lo[active] = np.where(below, f, a_f_lo)
+            hi[active] = np.where(below, a_hi, probe)
+            f_hi[active] = np.where(below, a_f_hi, f)
+            halved[active] = 2 * (hi[active] - lo[active]) <= a_hi - a_lo
+        # the end mapping closer to b
+        v = np.where(b - f_lo <= f_hi - b, lo, hi).view(np.float64)
+        return v.reshape(shape)
+
+class QuantileDiscretizer(BaseDiscretizer):
+    # data-adaptive buckets: edges[i] is the smallest value encoded to
+    # bucket i + 1 and values[i] is the value decoded from bucket i;
+    # val_min and val_max bound the fitted data and default to the outer
+    # bucket values
+    def __init__(self, num_bytes, edges, values, num_bits=None,
+                 val_min=None, val_max=None):
+        edges = np.array(edges, dtype=np.float64).ravel()
+        values = np.array(values, dtype=np.float64).ravel()
+        if values.size < 2:
+            raise DiscretizerException('Invalid number of bucket values.')
+        if val_min is None:
+            val_min = float(values[0])
+        if val_max is None:
+            val_max = float(values[-1])
+        BaseDiscretizer.__init__(self, num_bytes, val_min, val_max, num_bits)
+        if self.num_bytes > LOOKUP_TABLE_MAX_BYTES:
+            raise DiscretizerException('Quantile discretizers are limited '
+                                       'to %d bytes.' % LOOKUP_TABLE_MAX_BYTES)
+        if edges.size != self.max_bucket:
+            raise DiscretizerException('Invalid number of bucket edges.')
+        if values.size != self.num_buckets:
+            raise DiscretizerException('Invalid number of bucket values.')
+        if not (np.isfinite(edges).all() and np.isfinite(values).all()):
+            raise DiscretizerException('Edges and values must be finite.')
+        if np.any(np.diff(edges) < 0.0):
+            raise DiscretizerException('Edges must be sorted.')
+        if np.any(values[1:] < edges) or np.any(values[:-1] > edges):
+            raise DiscretizerException('Values must lie between edges.')
+        if (min(edges[0], values[0]) < self.val_min or
+                max(edges[-1], values[-1]) > self.val_max):
+            raise DiscretizerException('Edges and values must lie within '
+                                       'the min/max values.')
+        edges.flags.writeable = False
+        values.flags.writeable = False
+        self._edges = edges
+        self._values = values
+        self._edges_list = edges.tolist()
+        self._values_list = values.tolist()
+
+    @staticmethod
+    def fit(num_bytes, sample, num_bits=None):
+        num_bytes, num_bits = resolve_width(num_bytes, num_bits)
+        if num_bytes > LOOKUP_TABLE_MAX_BYTES:
+            raise DiscretizerException('Quantile discretizers are limited '
+                                       'to %d bytes.' % LOOKUP_TABLE_MAX_BYTES)
+        sample = np.asarray(sample)
+        if sample.dtype.kind != 'f':
+            raise DiscretizerException('Sample must be floats.')
+        sample = np.sort(sample[~np.isnan(sample)].ravel())
+        if sample.size < 2 or sample[0] == sample[-1]:
+            raise DiscretizerException('Sample needs at least two distinct '
+                                       'values.')
+
+        # bucket i covers quantiles [i/N, (i+1)/N) and decodes to the
+        # quantile in its middle
+        num_buckets = 2 ** num_bits
+        edges = np.quantile(sample, np.arange(1, num_buckets) /
+                            float(num_buckets))
+        values = np.quantile(sample, (np.arange(num_buckets) + 0.5) /
+                             float(num_buckets))
+        return QuantileDiscretizer(num_bytes, edges, values, num_bits,
+                                   float(sample[0]), float(sample[-1]))
+
+    @property
+    def edges(self):
+        return self._edges
+
+    @property
+    def values(self):
+        return self._values
+
+    def spec(self):
+        spec = BaseDiscretizer.spec(self)
+        spec['edges'] = self._edges_list
+        spec['values'] = self._values_list
+        return spec
+
+    def map_encoder(self, v):
+        raise DiscretizerException('Quantile discretizers have no mapping '
+                                   'function.')
+
+    def map_decoder(self, b):
+        raise DiscretizerException('Quantile discretizers have no mapping '
+                                   'function.')
+
+    def _shared_decode_table(self):
+        return (self._values, self._values_list)
+
+    def _shared_encode_table(self):
+        return (self._edges, self._edges_list)
+
+    def _scalar_edges(self):
+        return self._edges_list
+
+    def _scalar_values(self):
+        return self._values_list
+
+    def val_to_bucket_num(self, val):
+        if not isinstance(val, float):
+            raise DiscretizerException('Value must be a float.')
+        if val != val:
+            raise DiscretizerException('Value must not be NaN.')
+        return bisect.bisect_right(self._edges_list, val)
+
+    def vals_to_bucket_nums(self, vals):
+        vals = np.asarray(vals)
+        if vals.dtype.kind != 'f':
+            raise DiscretizerException('Values must be floats.')
+        vals = vals.ravel()
+        if np.isnan(vals).any():
+            raise DiscretizerException('Values must not be NaN.')
+        bucket_nums = np.searchsorted(self._edges, vals, side='right')
+        return bucket_nums.astype(np.uint64)
+
+    def bucket_num_to_val(self, bucket_num):
+        if not isinstance(bucket_num, int):
+            raise DiscretizerException('Bucket number must be an integer.')
+        if bucket_num < 0:
+            raise DiscretizerException('Bucket number must be >= 0.')
+        if bucket_num > self.max_bucket:
+            raise DiscretizerException('Bucket number must be <= maximum.')
+        return self._values_list[bucket_num]
+
+    def _bucket_nums_to_vals(self, bucket_nums, map_decoder_array=None):
+        return self._values[bucket_nums]
+
+    def _bucket_ranges(self, bucket_nums):
+        lower = np.concatenate([[self.val_min], self._edges])
+        upper = np.concatenate([self._edges, [self.val_max]])
+        return lower[bucket_nums], upper[bucket_nums]
+
+
+DISCRETIZER_TYPES = {
+    'LinearDiscretizer': LinearDiscretizer,
+    'CubeRootDiscretizer': CubeRootDiscretizer,
+    'SigmoidDiscretizer': SigmoidDiscretizer,
+    'QuantileDiscretizer': QuantileDiscretizer,
+}
+
+
+def discretizer_from_spec(spec):
+    if not isinstance(spec, dict):
+        raise DiscretizerException('Specification must be a dict.')
+    params = dict(spec)
+    cls = DISCRETIZER_TYPES.get(params.pop('type', None))
+    if cls is None:
+        raise DiscretizerException('Unknown discretizer type.')
+    try:
+        return cls(**params)
+    except TypeError:
+        raise DiscretizerException('Invalid discretizer specification.')
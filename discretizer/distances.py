@@ -0,0 +1,185 @@
+import numpy as np
+
+from .discretizers import BaseDiscretizer, DiscretizerException, \
+    LOOKUP_TABLE_MAX_BYTES, buckets_to_buffer, buffer_to_uint8
+
+
+METRICS = ('l2', 'l1', 'dot')
+
+# number of vectors evaluated at once, bounds the temporary index arrays
+DISTANCE_CHUNK_SIZE = 16384
+
+# per-query distance tables (dimensions x buckets) up to this many entries
+# replace the per-dimension value tables
+QUERY_TABLE_MAX_ENTRIES = 1 << 20
+
+
+class DistanceKernel(object):
+    # distances between float queries and encoded vectors without decoding
+    # them: every dimension has its own discretizer (or all share one), a
+    # vector is stored as its dimensions' fixed width records one after the
+    # other, and bucket numbers index per-dimension tables of decoded values
+    # or of per-query distance terms; 'l2' is the squared euclidean distance
+    def __init__(self, discretizers, dim=None):
+        if isinstance(discretizers, BaseDiscretizer):
+            if not isinstance(dim, int) or dim <= 0:
+                raise DiscretizerException('Dimension must be an integer > '
+                                           '0.')
+            discretizers = [discretizers] * dim
+        else:
+            discretizers = list(discretizers)
+            if dim is not None and dim != len(discretizers):
+                raise DiscretizerException('Invalid number of dimensions.')
+            if len(discretizers) == 0:
+                raise DiscretizerException('Dimension must be an integer > '
+                                           '0.')
+        for d in discretizers:
+            if not isinstance(d, BaseDiscretizer):
+                raise DiscretizerException('Dimension discretizer invalid.')
+        widths = set((d.num_bytes, d.num_bits) for d in discretizers)
+        if len(widths) != 1:
+            raise DiscretizerException('Dimensions must share one width.')
+        d0 = discretizers[0]
+        if d0.num_bytes > LOOKUP_TABLE_MAX_BYTES:
+            raise DiscretizerException('Lookup tables are limited to %d '
+                                       'bytes.' % LOOKUP_TABLE_MAX_BYTES)
+        self._discretizers = tuple(discretizers)
+        self._dim = len(discretizers)
+        self._num_bytes = d0.num_bytes
+        self._num_buckets = d0.num_buckets
+        self._check_max = d0.num_bits % 8 != 0
+
+        # decoded value of every bucket of every dimension, shared rows for
+        # dimensions using the same discretizer
+        bucket_nums = np.arange(self._num_buckets, dtype=np.uint64)
+        rows = {}
+        self._values = np.empty((self._dim, self._num_buckets))
+        for i, d in enumerate(discretizers):
+            if id(d) not in rows:
+                rows[id(d)] = d.bucket_nums_to_vals(bucket_nums)
+            self._values[i] = rows[id(d)]
+        self._values.flags.writeable = False
+        self._offsets = (np.arange(self._dim, dtype=np.intp) *
+                         self._num_buckets)
+
+    @property
+    def dim(self):
+        return self._dim
+
+    @property
+    def discretizers(self):
+        return self._discretizers
+
+    @property
+    def record_size(self):
+        return self._dim * self._num_bytes
+
+    @property
+    def values(self):
+        # (dim, num_buckets) decoded value tables
+        return self._values
+
+    def encode(self, vectors):
+        vectors = np.asarray(vectors)
+        if vectors.size == 0:
+            vectors = vectors.reshape(0, self._dim)
+        if vectors.ndim != 2 or vectors.shape[1] != self._dim:
+            raise DiscretizerException('Invalid number of dimensions.')
+        codes = np.empty(vectors.shape, dtype=np.uint64)
+        for i, d in enumerate(self._discretizers):
+            codes[:, i] = d.vals_to_bucket_nums(vectors[:, i])
+        return buckets_to_buffer(codes.ravel(), self._num_bytes)
+
+    def decode(self, buf):
+        codes = self.codes(buf)
+        return self._values.ravel()[codes + self._offsets]
+
+    def codes(self, buf, start=None, stop=None):
+        # (vectors, dim) bucket numbers of vectors [start, stop)
+        rows = self._rows(buf)[start:stop]
+        codes = rows.reshape(-1).view('>u%d' % self._num_bytes)
+        codes = codes.astype(np.intp).reshape(-1, self._dim)
+        if self._check_max and codes.size and \
+                codes.max() >= self._num_buckets:
+            raise DiscretizerException('Bucket number must be <= maximum.')
+        return codes
+
+    def count(self, buf):
+        return self._rows(buf).shape[0]
+
+    def _rows(self, buf):
+        return buffer_to_uint8(buf, self.record_size)
+
+    def _check_query(self, query, metric):
+        if metric not in METRICS:
+            raise DiscretizerException('Unknown metric.')
+        query = np.asarray(query, dtype=np.float64)
+        if query.shape != (self._dim,):
+            raise DiscretizerException('Invalid number of dimensions.')
+        if not np.isfinite(query).all():
+            raise DiscretizerException('Query must be finite.')
+        return query
+
+    def query_table(self, query, metric='l2'):
+        # (dim, num_buckets) distance term of every bucket of every
+        # dimension, a vector's distance is the sum of its buckets' terms
+        q = self._check_query(query, metric)[:, None]
+        if metric == 'l2':
+            return np.square(self._values - q)
+        if metric == 'l1':
+            return np.abs(self._values - q)
+        return self._values * q
+
+    def distances(self, query, buf, metric='l2',
+                  chunk_size=DISTANCE_CHUNK_SIZE):
+        # distance from the query to every encoded vector, larger is closer
+        # for 'dot'
+        out = [dist for _, dist in self._chunks(query, buf, metric,
+                                                chunk_size)]
+        return np.concatenate(out) if out else np.zeros(0)
+
+    def _chunks(self, query, buf, metric, chunk_size):
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise DiscretizerException('Chunk size must be an integer > 0.')
+        q = self._check_query(query, metric)
+        rows = self._rows(buf)
+        if self._values.size <= QUERY_TABLE_MAX_ENTRIES:
+            table = self.query_table(q, metric)
+            flat = table.ravel()
+        else:
+            # gather decoded values and compute the terms per chunk instead
+            table = None
+            flat = self._values.ravel()
+        for start in range(0, rows.shape[0], chunk_size):
+            codes = self.codes(rows[start:start + chunk_size])
+            terms = flat[codes + self._offsets]
+            if table is None:
+                if metric == 'l2':
+                    terms -= q
+                    np.square(terms, out=terms)
+                elif metric == 'l1':
+                    terms -= q
+                    np.abs(terms, out=terms)
+                else:
+                    terms *= q
+            yield start, terms.sum(axis=1)
+
+    def search(self, query, buf, k, metric='l2',
+               chunk_size=DISTANCE_CHUNK_SIZE):
+        # the k nearest vectors as (indices, distances), nearest first;
+        # only k candidates are kept between chunks
+        if not isinstance(k, int) or k <= 0:
+            raise DiscretizerException('k must be an integer > 0.')
+        sign = -1.0 if metric == 'dot' else 1.0
+        best_idx = np.zeros(0, dtype=np.intp)
+        best_key = np.zeros(0)
+        for start, dist in self._chunks(query, buf, metric, chunk_size):
+            idx = np.concatenate([best_idx,
+                                  np.arange(start, start + dist.size)])
+            key = np.concatenate([best_key, sign * dist])
+            if key.size > k:
+                keep = np.argpartition(key, k - 1)[:k]
+                idx, key = idx[keep], key[keep]
+            best_idx, best_key = idx, key
+        order = np.lexsort((best_idx, best_key))
+        return best_idx[order], sign * best_key[order]
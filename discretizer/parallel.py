@@ -0,0 +1,170 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .discretizers import DiscretizerException
+
+
+# smallest number of values handed to a worker in one task
+MIN_CHUNK_SIZE = 65536
+
+# process pool reused by encode_array(workers=...), recreated when the
+# number of workers changes
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+class SharedArray(object):
+    # flat numpy array in a shared memory block, workers attach to it by
+    # name; passing these to parallel_encode_array avoids copying the values
+    # in and the records out
+    def __init__(self, count, dtype, name=None):
+        if not isinstance(count, int) or count < 0:
+            raise DiscretizerException('Count must be an integer >= 0.')
+        self._count = count
+        self._dtype = np.dtype(dtype)
+        size = max(1, count * self._dtype.itemsize)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._array = np.ndarray(count, dtype=self._dtype,
+                                 buffer=self._shm.buf)
+
+    @staticmethod
+    def from_values(vals):
+        vals = np.asarray(vals).ravel()
+        shared = SharedArray(vals.size, vals.dtype)
+        shared.array[:] = vals
+        return shared
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def array(self):
+        return self._array
+
+    def __array__(self, dtype=None, copy=None):
+        if copy:
+            return np.array(self._array, dtype=dtype)
+        return self._array if dtype is None else self._array.astype(dtype)
+
+    def close(self):
+        # views of array must be dropped before closing
+        self._array = None
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.unlink()
+
+
+def _encode_chunk(d, in_name, out_name, count, start, stop):
+    # runs in a worker: read values from and write records to shared memory
+    shared_in = SharedArray(count, np.float64, in_name)
+    shared_out = SharedArray(count * d.num_bytes, np.uint8, out_name)
+    try:
+        shared_out.array[start * d.num_bytes:stop * d.num_bytes] = \
+            d.encode_array(shared_in.array[start:stop])
+    finally:
+        shared_in.close()
+        shared_out.close()
+
+
+def _chunk_bounds(count, workers):
+    # a few tasks per worker evens out the load
+    num_chunks = max(1, min(workers * 4, count // MIN_CHUNK_SIZE))
+    edges = np.linspace(0, count, num_chunks + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = None
+        _pool_workers = 0
+
+
+def parallel_encode_array(d, vals, workers, executor=None, out=None):
+    # vals may be a float64 SharedArray and out a uint8 SharedArray of
+    # count * num_bytes records, which are then used in place and out's
+    # array is returned; tasks run on executor or the shared pool
+    shared_in = vals if isinstance(vals, SharedArray) else None
+    if shared_in is not None:
+        if shared_in.dtype != np.float64:
+            raise DiscretizerException('Shared values must be float64.')
+        vals = shared_in.array
+    vals = np.asarray(vals)
+    if vals.dtype.kind != 'f':
+        raise DiscretizerException('Values must be floats.')
+    vals = vals.ravel()
+    count = vals.size
+    if out is not None and (not isinstance(out, SharedArray) or
+                            out.dtype != np.uint8 or
+                            out.count != count * d.num_bytes):
+        raise DiscretizerException('Output must be a uint8 shared array of '
+                                   'count * num_bytes.')
+    bounds = _chunk_bounds(count, workers)
+    if len(bounds) <= 1:
+        buf = d.encode_array(vals)
+        if out is None:
+            return buf
+        out.array[:] = buf
+        return out.array
+
+    created = []
+    try:
+        if shared_in is None:
+            shared_in = SharedArray.from_values(
+                vals.astype(np.float64, copy=False))
+            created.append(shared_in)
+        shared_out = out
+        if shared_out is None:
+            shared_out = SharedArray(count * d.num_bytes, np.uint8)
+            created.append(shared_out)
+
+        pool = executor or get_pool(workers)
+        futures = [pool.submit(_encode_chunk, d, shared_in.name,
+                               shared_out.name, count, start, stop)
+                   for start, stop in bounds]
+        for future in futures:
+            future.result()
+        result = shared_out.array if out is not None else \
+            shared_out.array.copy()
+    finally:
+        for shared in created:
+            shared.close()
+            shared.unlink()
+    return result
@@ -0,0 +1,120 @@
+import numpy as np
+
+from .discretizers import DiscretizerException, LinearDiscretizer, \
+    CubeRootDiscretizer, SigmoidDiscretizer
+
+
+# candidate mappings and sigmoid sharpness values tried by the planner
+PLAN_TYPES = (LinearDiscretizer, CubeRootDiscretizer, SigmoidDiscretizer)
+SHARPNESS_CANDIDATES = tuple(2.0 ** i for i in range(-1, 8))
+
+# wider discretizers have their worst case bucket error estimated from
+# this many evenly spaced buckets instead of every bucket
+PLAN_MAX_BUCKETS = 65536
+
+MAX_PLAN_BITS = 56
+
+
+def _region_bounds(d, region):
+    if region is None:
+        return d.val_min, d.val_max
+    try:
+        lo, hi = float(region[0]), float(region[1])
+    except (TypeError, ValueError, IndexError):
+        raise DiscretizerException('Region must be a (low, high) pair.')
+    if not lo <= hi:
+        raise DiscretizerException('Invalid region.')
+    return max(lo, d.val_min), min(hi, d.val_max)
+
+
+def _relative(lower, upper, vals):
+    # |x - val| / |x| peaks at an end of the interval, intervals touching
+    # zero have no bound unless they hold zero alone
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel = np.maximum(np.abs(lower - vals) / np.abs(lower),
+                         np.abs(upper - vals) / np.abs(upper))
+    zero = (lower <= 0.0) & (upper >= 0.0)
+    rel[zero] = np.where(lower[zero] == upper[zero],
+                         np.abs(vals[zero]), np.inf)
+    return rel
+
+
+def bucket_errors(d, relative=False, region=None):
+    # worst case reconstruction error of each bucket overlapping the region,
+    # returns (bucket numbers, errors)
+    lo, hi = _region_bounds(d, region)
+    b_lo, b_hi = d.bucket_bounds(lo, hi) if lo <= hi else (1, 0)
+    if b_lo > b_hi:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.float64)
+    if b_hi - b_lo < PLAN_MAX_BUCKETS:
+        bucket_nums = np.arange(b_lo, b_hi + 1, dtype=np.uint64)
+    else:
+        bucket_nums = np.linspace(b_lo, b_hi, PLAN_MAX_BUCKETS).round()
+        if lo <= 0.0 <= hi:
+            # relative errors peak around zero, never skip its buckets
+            bucket_nums = np.append(bucket_nums, d.bucket_bounds(0.0, 0.0))
+        bucket_nums = np.unique(bucket_nums.astype(np.uint64))
+    vals = d.bucket_nums_to_vals(bucket_nums)
+    lower, upper = d.bucket_ranges(bucket_nums)
+    lower = np.maximum(lower, lo)
+    upper = np.minimum(upper, hi)
+    if relative:
+        return bucket_nums, _relative(lower, upper, vals)
+    return bucket_nums, np.maximum(np.abs(vals - lower),
+                                   np.abs(upper - vals))
+
+
+def reconstruction_error(d, relative=False, region=None, sample=None):
+    # maximum reconstruction error within the region, over every value when
+    # no sample is given and over the sample values otherwise
+    if sample is None:
+        errors = bucket_errors(d, relative, region)[1]
+        return float(errors.max()) if errors.size else 0.0
+    sample = np.asarray(sample)
+    if sample.dtype.kind != 'f':
+        raise DiscretizerException('Sample must be floats.')
+    sample = sample.ravel()
+    lo, hi = _region_bounds(d, region)
+    sample = sample[(sample >= lo) & (sample <= hi)]
+    if sample.size == 0:
+        return 0.0
+    decoded = d.decode_array(d.encode_array(sample))
+    errors = np.abs(decoded - sample)
+    if relative:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.where(sample == 0.0, np.where(errors == 0.0, 0.0,
+                                                      np.inf),
+                              errors / np.abs(sample))
+    return float(errors.max())
+
+
+def _candidates(num_bits, val_min, val_max, types, sharpness):
+    num_bytes = (num_bits + 7) // 8
+    for cls in types:
+        if cls is SigmoidDiscretizer:
+            for k in sharpness:
+                yield cls(num_bytes, val_min, val_max, float(k),
+                          num_bits=num_bits)
+        else:
+            yield cls(num_bytes, val_min, val_max, num_bits=num_bits)
+
+
+def plan_discretizer(val_min, val_max, max_error, relative=False,
+                     region=None, sample=None, types=PLAN_TYPES,
+                     sharpness=SHARPNESS_CANDIDATES, whole_bytes=True):
+    # smallest discretizer meeting the error budget: widths are tried from
+    # narrowest up, whole bytes only unless whole_bytes is False, and at the
+    # first width where some candidate fits the one with the lowest error
+    # wins; returns (discretizer, error)
+    if not isinstance(max_error, float) or not max_error > 0.0:
+        raise DiscretizerException('Maximum error must be a float > 0.')
+    step = 8 if whole_bytes else 1
+    for num_bits in range(step, MAX_PLAN_BITS + 1, step):
+        best = None
+        for d in _candidates(num_bits, val_min, val_max, types, sharpness):
+            error = reconstruction_error(d, relative, region, sample)
+            if error <= max_error and (best is None or error < best[1]):
+                best = (d, error)
+        if best is not None:
+            return best
+    raise DiscretizerException('No configuration meets the error budget.')
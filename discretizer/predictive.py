@@ -0,0 +1,141 @@
+import numpy as np
+
+from .discretizers import BaseDiscretizer, DiscretizerException, \
+    buckets_to_buffer, buffer_to_buckets, buffer_to_uint8, \
+    discretizer_from_spec
+
+
+# samples per block, each block starts with a keyframe
+KEYFRAME_INTERVAL = 256
+
+
+class PredictiveCodec(object):
+    # lossy delta coding for slowly changing signals: every block starts
+    # with a keyframe encoded with the full range discretizer, the other
+    # samples store the difference to the previous reconstructed value with
+    # the (narrower) residual discretizer; predicting from decoded values
+    # keeps errors from accumulating, residuals beyond the residual range
+    # are clamped and caught up on over the following samples
+    def __init__(self, keyframe, residual,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        if not isinstance(keyframe, BaseDiscretizer) or \
+                not isinstance(residual, BaseDiscretizer):
+            raise DiscretizerException('Keyframe and residual must be '
+                                       'discretizers.')
+        if not isinstance(keyframe_interval, int) or keyframe_interval <= 0:
+            raise DiscretizerException('Keyframe interval must be an '
+                                       'integer > 0.')
+        self._keyframe = keyframe
+        self._residual = residual
+        self._interval = keyframe_interval
+        self._block_size = (keyframe.num_bytes +
+                            (keyframe_interval - 1) * residual.num_bytes)
+
+    @property
+    def keyframe(self):
+        return self._keyframe
+
+    @property
+    def residual(self):
+        return self._residual
+
+    @property
+    def keyframe_interval(self):
+        return self._interval
+
+    def spec(self):
+        return {'keyframe': self._keyframe.spec(),
+                'residual': self._residual.spec(),
+                'keyframe_interval': self._interval}
+
+    @staticmethod
+    def from_spec(spec):
+        try:
+            return PredictiveCodec(discretizer_from_spec(spec['keyframe']),
+                                   discretizer_from_spec(spec['residual']),
+                                   spec['keyframe_interval'])
+        except (KeyError, TypeError):
+            raise DiscretizerException('Invalid predictive specification.')
+
+    def encoded_size(self, count):
+        full, rest = divmod(count, self._interval)
+        size = full * self._block_size
+        if rest:
+            size += (self._keyframe.num_bytes +
+                     (rest - 1) * self._residual.num_bytes)
+        return size
+
+    def count(self, buf_size):
+        # number of samples held by an encoded buffer of buf_size bytes
+        full, rest = divmod(buf_size, self._block_size)
+        count = full * self._interval
+        if rest:
+            rest -= self._keyframe.num_bytes
+            if rest < 0 or rest % self._residual.num_bytes:
+                raise DiscretizerException('Invalid number of bytes parsed.')
+            count += 1 + rest // self._residual.num_bytes
+        return count
+
+    def encode_array(self, vals):
+        vals = np.asarray(vals)
+        if vals.dtype.kind != 'f':
+            raise DiscretizerException('Values must be floats.')
+        vals = vals.astype(np.float64, copy=False).ravel()
+        count = vals.size
+        if count == 0:
+            return np.zeros(0, dtype=np.uint8)
+
+        # one row per block, blocks are independent so each step below is
+        # vectorized over all of them; the last block is padded
+        num_blocks = -(-count // self._interval)
+        grid = np.empty(num_blocks * self._interval, dtype=np.float64)
+        grid[:count] = vals
+        grid[count:] = vals[-1]
+        grid = grid.reshape(num_blocks, self._interval)
+
+        key_nums = self._keyframe._encode_bucket_nums(grid[:, 0])
+        recon = self._keyframe.bucket_nums_to_vals(key_nums)
+        res_nums = np.empty((num_blocks, self._interval - 1),
+                            dtype=np.uint64)
+        for j in range(1, self._interval):
+            bucket_nums = self._residual._encode_bucket_nums(
+                grid[:, j] - recon)
+            res_nums[:, j - 1] = bucket_nums
+            recon = recon + self._residual.bucket_nums_to_vals(bucket_nums)
+
+        rows = np.concatenate([
+            buckets_to_buffer(key_nums, self._keyframe.num_bytes)
+            .reshape(num_blocks, -1),
+            buckets_to_buffer(res_nums.ravel(), self._residual.num_bytes)
+            .reshape(num_blocks, -1)], axis=1)
+        return rows.ravel()[:self.encoded_size(count)]
+
+    def decode_array(self, buf, start=None, stop=None):
+        # decodes samples [start, stop), only the blocks holding them are
+        # read
+        raw = buffer_to_uint8(buf)
+        count = self.count(raw.size)
+        start, stop = slice(start, stop).indices(count)[:2]
+        if start >= stop:
+            return np.zeros(0, dtype=np.float64)
+
+        first = start // self._interval
+        last = -(-stop // self._interval)
+        block = raw[first * self._block_size:last * self._block_size]
+        padded = np.zeros((last - first) * self._block_size, dtype=np.uint8)
+        padded[:block.size] = block
+        rows = padded.reshape(last - first, self._block_size)
+
+        key_bytes = self._keyframe.num_bytes
+        key_nums = buffer_to_buckets(rows[:, :key_bytes], key_bytes)
+        res_nums = buffer_to_buckets(rows[:, key_bytes:],
+                                     self._residual.num_bytes)
+
+        # the running sum adds in the same order as the encoder did
+        steps = np.empty((last - first, self._interval), dtype=np.float64)
+        steps[:, 0] = self._keyframe.bucket_nums_to_vals(key_nums)
+        steps[:, 1:] = self._residual.bucket_nums_to_vals(res_nums).reshape(
+            last - first, -1)
+        vals = np.cumsum(steps, axis=1).ravel()
+        offset = first * self._interval
+        return vals[start - offset:stop - offset]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from .discretizers import buffer_to_buckets
+
+
+class BucketIndex(object):
+    # sorted index over the bucket numbers of a packed buffer, range
+    # queries are answered by binary search without decoding any values
+    def __init__(self, buf, discretizer):
+        self._discretizer = discretizer
+        bucket_nums = buffer_to_buckets(buf, discretizer.num_bytes)
+        # stable sort keeps matching record indices in ascending order
+        # within each bucket
+        self._order = np.argsort(bucket_nums, kind='stable')
+        self._sorted = bucket_nums[self._order]
+
+    @property
+    def discretizer(self):
+        return self._discretizer
+
+    def __len__(self):
+        return self._sorted.size
+
+    def _span(self, lo, hi, conservative):
+        b_lo, b_hi = self._discretizer.bucket_bounds(lo, hi, conservative)
+        if b_lo > b_hi:
+            return 0, 0
+        start = np.searchsorted(self._sorted, np.uint64(b_lo), side='left')
+        stop = np.searchsorted(self._sorted, np.uint64(b_hi), side='right')
+        return int(start), int(stop)
+
+    def query(self, lo=None, hi=None, conservative=True, sort=True):
+        # record indices whose buckets fall within the value bounds
+        start, stop = self._span(lo, hi, conservative)
+        idx = self._order[start:stop]
+        return np.sort(idx) if sort else idx
+
+    def count(self, lo=None, hi=None, conservative=True):
+        start, stop = self._span(lo, hi, conservative)
+        return stop - start
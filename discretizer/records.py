@@ -0,0 +1,131 @@
+import numpy as np
+
+from .discretizers import BaseDiscretizer, DiscretizerException, \
+    buffer_to_uint8, discretizer_from_spec
+
+
+class RecordCodec(object):
+    # packs records of several floats, each with its own discretizer, into
+    # fixed width records made of the fields' big-endian encodings
+    def __init__(self, schema):
+        names = []
+        discretizers = []
+        for i, field in enumerate(schema):
+            if isinstance(field, BaseDiscretizer):
+                name, d = 'f%d' % i, field
+            else:
+                try:
+                    name, d = field
+                except (TypeError, ValueError):
+                    raise DiscretizerException('Schema fields must be '
+                                               '(name, discretizer) pairs.')
+            if not isinstance(name, str):
+                raise DiscretizerException('Field name must be a string.')
+            if not isinstance(d, BaseDiscretizer):
+                raise DiscretizerException('Field discretizer invalid.')
+            if name in names:
+                raise DiscretizerException('Duplicate field name.')
+            names.append(name)
+            discretizers.append(d)
+        if len(names) == 0:
+            raise DiscretizerException('Schema is empty.')
+        self._names = tuple(names)
+        self._discretizers = tuple(discretizers)
+        self._offsets = {}
+        offset = 0
+        for name, d in zip(self._names, self._discretizers):
+            self._offsets[name] = offset
+            offset += d.num_bytes
+        self._record_size = offset
+        self._dtype = np.dtype([(name, np.float64) for name in self._names])
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def discretizers(self):
+        return self._discretizers
+
+    @property
+    def record_size(self):
+        return self._record_size
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    def field_offset(self, name):
+        if name not in self._offsets:
+            raise DiscretizerException('Unknown field name.')
+        return self._offsets[name]
+
+    def spec(self):
+        return [[name, d.spec()]
+                for name, d in zip(self._names, self._discretizers)]
+
+    @staticmethod
+    def from_spec(spec):
+        return RecordCodec([(name, discretizer_from_spec(d_spec))
+                            for name, d_spec in spec])
+
+    def encode(self, record):
+        if len(record) != len(self._names):
+            raise DiscretizerException('Invalid number of fields.')
+        ba = bytearray()
+        for val, d in zip(record, self._discretizers):
+            ba += d.encode(val)
+        return ba
+
+    def decode(self, ba):
+        if not isinstance(ba, bytearray):
+            raise DiscretizerException('Input not bytearray.')
+        if len(ba) != self._record_size:
+            raise DiscretizerException('Invalid number of bytes parsed.')
+        vals = []
+        offset = 0
+        for d in self._discretizers:
+            vals.append(d.decode(ba[offset:offset + d.num_bytes]))
+            offset += d.num_bytes
+        return tuple(vals)
+
+    def encode_array(self, records):
+        columns = self._columns(records)
+        n = columns[0].size
+        out = np.empty((n, self._record_size), dtype=np.uint8)
+        for name, d, col in zip(self._names, self._discretizers, columns):
+            offset = self._offsets[name]
+            out[:, offset:offset + d.num_bytes] = \
+                d.encode_array(col).reshape(n, d.num_bytes)
+        return out.ravel()
+
+    def decode_array(self, buf):
+        rows = self._rows(buf)
+        out = np.empty(rows.shape[0], dtype=self._dtype)
+        for name, d in zip(self._names, self._discretizers):
+            offset = self._offsets[name]
+            out[name] = d.decode_array(rows[:, offset:offset + d.num_bytes])
+        return out
+
+    def decode_field(self, buf, name):
+        # decodes a single column, the other fields are not touched
+        offset = self.field_offset(name)
+        d = self._discretizers[self._names.index(name)]
+        rows = self._rows(buf)
+        return d.decode_array(rows[:, offset:offset + d.num_bytes])
+
+    def _columns(self, records):
+        if isinstance(records, np.ndarray) and records.dtype.names:
+            missing = set(self._names) - set(records.dtype.names)
+            if missing:
+                raise DiscretizerException('Missing fields in records.')
+            return [records[name].ravel() for name in self._names]
+        records = np.asarray(records)
+        if records.size == 0:
+            records = records.reshape(0, len(self._names))
+        if records.ndim != 2 or records.shape[1] != len(self._names):
+            raise DiscretizerException('Invalid number of fields.')
+        return [records[:, i] for i in range(len(self._names))]
+
+    def _rows(self, buf):
+        return buffer_to_uint8(buf, self._record_size)
@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+
+from .discretizers import buffer_to_buckets
+
+
+# bucket usage histograms hold at most 2^HISTOGRAM_MAX_BITS bins, wider
+# discretizers group neighbouring buckets together
+HISTOGRAM_MAX_BITS = 16
+
+# latency histogram bin i counts calls that took [2^(i-1), 2^i) ns
+LATENCY_BINS = 64
+
+
+class OperationStats(object):
+    def __init__(self, timing):
+        self.calls = 0
+        self.values = 0
+        self.total_ns = 0
+        self.latency = np.zeros(LATENCY_BINS, dtype=np.int64) \
+            if timing else None
+
+    def record(self, count, elapsed_ns):
+        self.calls += 1
+        self.values += count
+        if self.latency is not None:
+            self.total_ns += elapsed_ns
+            self.latency[min(elapsed_ns.bit_length(), LATENCY_BINS - 1)] += 1
+
+    def as_dict(self):
+        out = {'calls': self.calls, 'values': self.values}
+        if self.latency is not None:
+            out['total_ns'] = self.total_ns
+            out['ns_per_value'] = (float(self.total_ns) / self.values
+                                   if self.values else 0.0)
+            # keyed by the upper bound of each bin in nanoseconds
+            out['latency_ns'] = dict((2 ** i, int(c))
+                                     for i, c in enumerate(self.latency)
+                                     if c)
+        return out
+
+
+class DiscretizerStats(object):
+    def __init__(self, discretizer, histogram=True, timing=True):
+        self._val_min = discretizer.val_min
+        self._val_max = discretizer.val_max
+        self._timing = timing
+        num_bits = discretizer.num_bits
+        self._hist_shift = max(0, num_bits - HISTOGRAM_MAX_BITS)
+        self.histogram = None
+        if histogram:
+            size = 2 ** (num_bits - self._hist_shift)
+            self.histogram = np.zeros(size, dtype=np.int64)
+        self.below_range = 0
+        self.above_range = 0
+        self.in_range = 0
+        self.encode_stats = OperationStats(timing)
+        self.decode_stats = OperationStats(timing)
+
+    def reset(self):
+        if self.histogram is not None:
+            self.histogram[:] = 0
+        self.below_range = 0
+        self.above_range = 0
+        self.in_range = 0
+        self.encode_stats = OperationStats(self._timing)
+        self.decode_stats = OperationStats(self._timing)
+
+    def encode(self, d, val):
+        start = time.perf_counter_ns() if self._timing else 0
+        bucket_num = d._encode_bucket_num(val)
+        ba = d._pack_bucket_num(bucket_num)
+        elapsed = time.perf_counter_ns() - start if self._timing else 0
+        if val < self._val_min:
+            self.below_range += 1
+        elif val > self._val_max:
+            self.above_range += 1
+        else:
+            self.in_range += 1
+        if self.histogram is not None:
+            self.histogram[bucket_num >> self._hist_shift] += 1
+        self.encode_stats.record(1, elapsed)
+        return ba
+
+    def decode(self, d, bucket_num):
+        start = time.perf_counter_ns() if self._timing else 0
+        val = d._decode_bucket_num(bucket_num)
+        elapsed = time.perf_counter_ns() - start if self._timing else 0
+        self.decode_stats.record(1, elapsed)
+        return val
+
+    def encode_array(self, d, vals, workers):
+        vals = np.asarray(vals)
+        start = time.perf_counter_ns() if self._timing else 0
+        buf = d._encode_array(vals, workers)
+        elapsed = time.perf_counter_ns() - start if self._timing else 0
+        below = int(np.count_nonzero(vals < self._val_min))
+        above = int(np.count_nonzero(vals > self._val_max))
+        self.below_range += below
+        self.above_range += above
+        self.in_range += vals.size - below - above
+        if self.histogram is not None:
+            bucket_nums = buffer_to_buckets(buf, d.num_bytes)
+            self.histogram += np.bincount(
+                (bucket_nums >> np.uint64(self._hist_shift)).astype(np.intp),
+                minlength=self.histogram.size)
+        self.encode_stats.record(vals.size, elapsed)
+        return buf
+
+    def decode_array(self, d, buf):
+        start = time.perf_counter_ns() if self._timing else 0
+        vals = d._decode_array(buf)
+        elapsed = time.perf_counter_ns() - start if self._timing else 0
+        self.decode_stats.record(vals.size, elapsed)
+        return vals
+
+    def as_dict(self):
+        out = {'below_range': self.below_range,
+               'above_range': self.above_range,
+               'in_range': self.in_range,
+               'encode': self.encode_stats.as_dict(),
+               'decode': self.decode_stats.as_dict()}
+        if self.histogram is not None:
+            used = int(np.count_nonzero(self.histogram))
+            out['histogram'] = {
+                'buckets_per_bin': 2 ** self._hist_shift,
+                'bins_used': used,
+                'bins_used_fraction': float(used) / self.histogram.size,
+                'counts': self.histogram.tolist(),
+            }
+        return out
+
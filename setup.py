@@ -5,4 +5,5 @@ setup(
     version='0.1',
     packages=find_packages(),
     include_package_data=True,
+    install_requires=['numpy'],
 )
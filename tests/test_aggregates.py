@@ -0,0 +1,117 @@
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import LinearDiscretizer, SigmoidDiscretizer, \
+    QuantileDiscretizer, DiscretizerException, BucketAggregate
+
+
+def _discretizers():
+    rng = np.random.RandomState(4)
+    return [LinearDiscretizer(1, -10.0, 20.0),
+            SigmoidDiscretizer(2, -10.0, 20.0, 20.0),
+            SigmoidDiscretizer(3, -10.0, 20.0, 20.0),
+            LinearDiscretizer(2, -10.0, 20.0, num_bits=12),
+            QuantileDiscretizer.fit(1, rng.normal(5.0, 4.0, 2000))]
+
+
+class TestAggregates(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.sample = rng.normal(5.0, 4.0, 20000)
+
+    def _vals(self, d):
+        # error bounds only hold for values inside the discretizer range
+        return np.clip(self.sample, d.val_min, d.val_max)
+
+    def test_bucket_ranges(self):
+        for d in _discretizers():
+            vals = self._vals(d)
+            bucket_nums = d.vals_to_bucket_nums(vals)
+            lower, upper = d.bucket_ranges(bucket_nums)
+            self.assertTrue(np.all(lower <= upper))
+            self.assertTrue(np.all(vals >= lower - 1e-9))
+            self.assertTrue(np.all(vals <= upper + 1e-9))
+        with self.assertRaises(DiscretizerException):
+            LinearDiscretizer(1, 0.0, 1.0).bucket_ranges([256])
+
+    def test_estimates(self):
+        for d in _discretizers():
+            vals = self._vals(d)
+            agg = BucketAggregate(d, d.encode_array(vals))
+            decoded = d.decode_array(d.encode_array(vals))
+            self.assertEqual(agg.count(), vals.size)
+
+            total, error = agg.sum()
+            self.assertAlmostEqual(total, decoded.sum(), 6)
+            self.assertLessEqual(abs(total - vals.sum()), error + 1e-6)
+
+            mean, error = agg.mean()
+            self.assertLessEqual(abs(mean - vals.mean()), error + 1e-9)
+
+            for est, func in ((agg.min(), np.min), (agg.max(), np.max)):
+                self.assertLessEqual(abs(est[0] - func(vals)),
+                                     est[1] + 1e-9)
+
+            q = np.array([0.0, 0.1, 0.5, 0.9, 1.0])
+            est, error = agg.quantile(q)
+            exact = np.quantile(vals, q, method='inverted_cdf')
+            self.assertTrue(np.all(np.abs(est - exact) <= error + 1e-9))
+            self.assertEqual(agg.quantile(0.5)[0], est[2])
+
+            hist, edges, uncertain = agg.histogram(bins=20,
+                                                   range=(-10.0, 20.0))
+            exact, _ = np.histogram(vals, bins=edges)
+            self.assertEqual(hist.sum(), vals.size)
+            # a bin can only gain or lose values of straddling buckets
+            # overlapping it, which may span several bins
+            lower, upper = d.bucket_ranges(agg.buckets)
+            straddles = (np.searchsorted(edges[1:-1], lower, side='right') !=
+                         np.searchsorted(edges[1:-1], upper, side='left'))
+            overlaps = ((lower[:, None] <= edges[None, 1:]) &
+                        (upper[:, None] >= edges[None, :-1]))
+            bound = np.dot(agg.counts * straddles, overlaps)
+            self.assertTrue(np.all(np.abs(hist - exact) <= bound))
+            self.assertEqual(uncertain.sum(), agg.counts[straddles].sum())
+
+    def test_quantile_min_max(self):
+        # the outer buckets reach the true extremes of skewed data
+        sample = np.random.RandomState(1).lognormal(0.0, 1.0, 20000)
+        d = QuantileDiscretizer.fit(1, sample)
+        agg = BucketAggregate(d, d.encode_array(sample))
+        for est, func in ((agg.min(), np.min), (agg.max(), np.max)):
+            self.assertLessEqual(abs(est[0] - func(sample)), est[1] + 1e-9)
+
+    def test_merge(self):
+        for d in _discretizers():
+            vals = self._vals(d)
+            whole = BucketAggregate(d, d.encode_array(vals))
+            merged = BucketAggregate(d)
+            for chunk in np.array_split(vals, 7):
+                merged.merge(BucketAggregate(d, d.encode_array(chunk)))
+            np.testing.assert_array_equal(merged.buckets, whole.buckets)
+            np.testing.assert_array_equal(merged.counts, whole.counts)
+            self.assertEqual(merged.sum(), whole.sum())
+
+        with self.assertRaises(DiscretizerException):
+            BucketAggregate(LinearDiscretizer(1, 0.0, 1.0)).merge(
+                BucketAggregate(LinearDiscretizer(1, 0.0, 2.0)))
+
+    def test_empty(self):
+        agg = BucketAggregate(LinearDiscretizer(2, 0.0, 1.0), bytearray())
+        self.assertEqual(agg.count(), 0)
+        self.assertEqual(agg.sum(), (0.0, 0.0))
+        with self.assertRaises(DiscretizerException):
+            agg.mean()
+        with self.assertRaises(DiscretizerException):
+            agg.quantile(0.5)
+
+    def test_invalid_buckets(self):
+        d = LinearDiscretizer(2, 0.0, 1.0, num_bits=10)
+        with self.assertRaises(DiscretizerException):
+            BucketAggregate(d, bytearray([0xff, 0xff]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, SigmoidDiscretizer
+from discretizer import aio
+
+
+async def loopback(batches, discretizer, max_batch_values=aio.MAX_BATCH_VALUES):
+    # serve one connection that streams the batches, read them back
+    async def handle(reader, writer):
+        stream = await aio.open_writer(writer, discretizer)
+        for batch in batches:
+            await stream.write_batch(batch)
+        await stream.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        stream = await aio.open_reader(reader, max_batch_values)
+        received = [batch async for batch in stream]
+        writer.close()
+        await writer.wait_closed()
+    finally:
+        server.close()
+        await server.wait_closed()
+    return stream.discretizer, received
+
+
+async def read_raw(data):
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    stream = aio.DiscretizedStreamReader(reader)
+    return [batch async for batch in stream]
+
+
+class TestAsyncStreams(unittest.TestCase):
+    def test_loopback(self):
+        d = SigmoidDiscretizer(2, -5.0, 5.0, 20.0)
+        rng = np.random.RandomState(0)
+        batches = [rng.uniform(-6.0, 6.0, 100), np.zeros(0),
+                   rng.uniform(-6.0, 6.0, aio.OFFLOAD_THRESHOLD + 1)]
+        d2, received = asyncio.run(loopback(batches, d))
+        self.assertEqual(d2.spec(), d.spec())
+        self.assertEqual(len(received), 3)
+        for batch, out in zip(batches, received):
+            np.testing.assert_array_equal(
+                out, d.decode_array(d.encode_array(batch)))
+
+    def test_empty_stream(self):
+        d = SigmoidDiscretizer(1, -5.0, 5.0, 20.0)
+        d2, received = asyncio.run(loopback([], d))
+        self.assertEqual(d2.spec(), d.spec())
+        self.assertEqual(received, [])
+
+    def test_limits(self):
+        d = SigmoidDiscretizer(1, -5.0, 5.0, 20.0)
+        self.assertRaises(DiscretizerException, asyncio.run,
+                          loopback([np.zeros(10)], d, max_batch_values=5))
+
+    def test_invalid(self):
+        self.assertRaises(DiscretizerException, asyncio.run,
+                          read_raw(b'XXXX' + bytes(6)))
+        self.assertRaises(DiscretizerException, asyncio.run,
+                          read_raw(b'DSCS'))
+        header = aio._HEADER.pack(aio.MAGIC, aio.VERSION, 2) + b'{}'
+        self.assertRaises(DiscretizerException, asyncio.run,
+                          read_raw(header))
+        spec = (b'{"num_bytes": 2, "type": "LinearDiscretizer", '
+                b'"val_max": 1.0, "val_min": 0.0}')
+        header = aio._HEADER.pack(aio.MAGIC, aio.VERSION, len(spec)) + spec
+        self.assertEqual(asyncio.run(read_raw(header)), [])
+        self.assertRaises(DiscretizerException, asyncio.run,
+                          read_raw(header + b'\x00\x00'))
+        self.assertRaises(DiscretizerException, asyncio.run,
+                          read_raw(header + b'\x00\x00\x00\x02\x00\x00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
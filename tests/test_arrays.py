@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    SigmoidDiscretizer, DiscretizedArray
+
+
+class TestDiscretizedArray(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.vals = rng.uniform(-10.0, 20.0, 1000)
+        self.d = SigmoidDiscretizer(3, -10.0, 20.0, 20.0)
+        self.buf = self.d.encode_array(self.vals)
+        self.decoded = self.d.decode_array(self.buf)
+        self.arr = DiscretizedArray(self.buf, self.d)
+
+    def test_basics(self):
+        arr = self.arr
+        self.assertEqual(len(arr), 1000)
+        self.assertEqual(arr.shape, (1000,))
+        self.assertEqual(arr.dtype, np.float64)
+        self.assertEqual(arr.nbytes, 3000)
+        self.assertEqual(arr.tobytes(), self.buf.tobytes())
+        np.testing.assert_array_equal(np.asarray(arr), self.decoded)
+        np.testing.assert_array_equal(arr.decode(), self.decoded)
+        np.testing.assert_array_equal(arr.bucket_nums(),
+                                      self.d.vals_to_bucket_nums(self.vals))
+        self.assertEqual(np.asarray(arr, dtype=np.float32).dtype, np.float32)
+        self.assertAlmostEqual(np.mean(arr), self.decoded.mean())
+
+    def test_indexing(self):
+        arr = self.arr
+        self.assertEqual(arr[0], self.decoded[0])
+        self.assertEqual(arr[-1], self.decoded[-1])
+        self.assertEqual(arr[np.int64(5)], self.decoded[5])
+        with self.assertRaises(IndexError):
+            arr[1000]
+        with self.assertRaises(IndexError):
+            arr[-1001]
+        with self.assertRaises(DiscretizerException):
+            arr[1.0]
+
+        np.testing.assert_array_equal(arr[[3, 1, 4]], self.decoded[[3, 1, 4]])
+        mask = self.vals > 5.0
+        np.testing.assert_array_equal(arr[mask], self.decoded[mask])
+        with self.assertRaises(IndexError):
+            arr[[1000]]
+
+    def test_slicing(self):
+        part = self.arr[100:200:3]
+        self.assertIsInstance(part, DiscretizedArray)
+        self.assertTrue(np.shares_memory(part.records, self.buf))
+        np.testing.assert_array_equal(np.asarray(part),
+                                      self.decoded[100:200:3])
+        np.testing.assert_array_equal(np.asarray(part[::-1]),
+                                      self.decoded[100:200:3][::-1])
+        self.assertEqual(part[2], self.decoded[106])
+        self.assertEqual(len(self.arr[2000:]), 0)
+
+    def test_iteration(self):
+        self.assertEqual(list(self.arr), self.decoded.tolist())
+        chunks = list(self.arr.chunks(300))
+        self.assertEqual([c.size for c in chunks], [300, 300, 300, 100])
+        np.testing.assert_array_equal(np.concatenate(chunks), self.decoded)
+        with self.assertRaises(DiscretizerException):
+            list(self.arr.chunks(0))
+
+    def test_construction(self):
+        d = LinearDiscretizer(2, 0.0, 1.0)
+        arr = DiscretizedArray.from_values(d, np.array([0.0, 0.5, 1.0]))
+        self.assertEqual(list(arr), [0.0, d.decode(d.encode(0.5)), 1.0])
+        self.assertEqual(len(DiscretizedArray(bytes(arr.tobytes()), d)), 3)
+        with self.assertRaises(DiscretizerException):
+            DiscretizedArray(bytearray(3), d)
+        with self.assertRaises(DiscretizerException):
+            DiscretizedArray(np.zeros(4, dtype=np.int8), d)
+        with self.assertRaises(DiscretizerException):
+            DiscretizedArray(np.zeros((2, 3), dtype=np.uint8), d)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    BlockQuantizer
+
+
+class TestBlockQuantizer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        # channels with very different ranges
+        scales = 10.0 ** np.arange(-3, 3)
+        self.arr = rng.normal(0.0, 1.0, (6, 50, 40)) * scales[:, None, None]
+
+    def check_error(self, q, arr, decoded, mins, maxs, blocks):
+        # within half a bucket of the block range
+        half = 0.5 / q.discretizer.max_bucket_float
+        bound = (maxs - mins)[blocks] * half * (1 + 1e-9) + 1e-300
+        self.assertTrue(np.all(np.abs(decoded - arr).ravel() <= bound))
+
+    def test_axis(self):
+        for axis in (0, -1):
+            q = BlockQuantizer(1, axis=axis)
+            buf = q.encode(self.arr)
+            self.assertEqual(buf.size, q.encoded_size(self.arr.shape))
+            self.assertEqual(q.num_blocks(self.arr.shape),
+                             self.arr.shape[axis])
+            decoded = q.decode(buf, self.arr.shape)
+            self.assertEqual(decoded.shape, self.arr.shape)
+            mins, maxs = q.block_ranges(buf, self.arr.shape)
+            moved = np.moveaxis(self.arr, axis, 0).reshape(
+                self.arr.shape[axis], -1)
+            self.assertTrue(np.all(mins <= moved.min(axis=1)))
+            self.assertTrue(np.all(maxs >= moved.max(axis=1)))
+            blocks = np.indices(self.arr.shape)[axis % 3].ravel()
+            self.check_error(q, self.arr, decoded, mins, maxs, blocks)
+
+        # far better than one global range for the small channels
+        q = BlockQuantizer(1, axis=0)
+        d = LinearDiscretizer(1, self.arr.min(), self.arr.max())
+        err_block = np.abs(q.decode(q.encode(self.arr), self.arr.shape) -
+                           self.arr)[0].max()
+        err_global = np.abs(d.decode_array(d.encode_array(self.arr)) -
+                            self.arr.ravel()).reshape(self.arr.shape)[0].max()
+        self.assertLess(err_block * 1000, err_global)
+
+    def test_block_size(self):
+        for shape in ((12000,), (6, 50, 40), (7, 13)):
+            arr = self.arr.ravel()[:int(np.prod(shape))].reshape(shape)
+            for num_bytes, param_dtype in ((1, 'f4'), (2, 'f8')):
+                q = BlockQuantizer(num_bytes, block_size=64,
+                                   param_dtype=param_dtype)
+                buf = q.encode(arr)
+                self.assertEqual(q.num_blocks(shape), -(-arr.size // 64))
+                decoded = q.decode(buf, shape)
+                self.assertEqual(decoded.shape, shape)
+                mins, maxs = q.block_ranges(buf, shape)
+                blocks = np.arange(arr.size) // 64
+                self.check_error(q, arr, decoded, mins, maxs, blocks)
+
+    def test_sigmoid_and_bits(self):
+        q = BlockQuantizer(2, axis=1, sharpness=8.0, num_bits=12)
+        buf = q.encode(self.arr)
+        decoded = q.decode(buf, self.arr.shape)
+        mins, maxs = q.block_ranges(buf, self.arr.shape)
+        lo = mins[None, :, None]
+        hi = maxs[None, :, None]
+        self.assertTrue(np.all((decoded >= lo) & (decoded <= hi)))
+        self.assertLess(np.abs(decoded - self.arr).max(),
+                        0.05 * (hi - lo).max())
+
+    def test_constant_and_empty(self):
+        q = BlockQuantizer(1, block_size=4)
+        arr = np.array([3.0, 3.0, 3.0, 3.0, -1.5])
+        np.testing.assert_array_equal(q.decode(q.encode(arr), arr.shape),
+                                      arr)
+        empty = np.zeros((0, 3))
+        self.assertEqual(q.decode(q.encode(empty), empty.shape).shape,
+                         (0, 3))
+        q = BlockQuantizer(1, axis=1)
+        self.assertEqual(q.decode(q.encode(empty), empty.shape).shape,
+                         (0, 3))
+
+    def test_spec(self):
+        q = BlockQuantizer(2, block_size=32, sharpness=4.0, num_bits=10)
+        copy = BlockQuantizer.from_spec(json.loads(json.dumps(q.spec())))
+        np.testing.assert_array_equal(copy.encode(self.arr),
+                                      q.encode(self.arr))
+        with self.assertRaises(DiscretizerException):
+            BlockQuantizer.from_spec({'num_bytes': 1, 'block_size': 4,
+                                      'colour': 'red'})
+
+    def test_invalid(self):
+        with self.assertRaises(DiscretizerException):
+            BlockQuantizer(1)
+        with self.assertRaises(DiscretizerException):
+            BlockQuantizer(1, axis=0, block_size=4)
+        with self.assertRaises(DiscretizerException):
+            BlockQuantizer(1, block_size=0)
+        with self.assertRaises(DiscretizerException):
+            BlockQuantizer(1, axis=0, param_dtype='f2')
+        q = BlockQuantizer(1, axis=3)
+        with self.assertRaises(DiscretizerException):
+            q.encode(self.arr)
+        q = BlockQuantizer(1, axis=0)
+        with self.assertRaises(DiscretizerException):
+            q.encode(np.array([[1.0, np.nan]]))
+        with self.assertRaises(DiscretizerException):
+            q.encode(np.array([[1, 2]]))
+        with self.assertRaises(DiscretizerException):
+            q.encode(np.array([[1e300]]))
+        with self.assertRaises(DiscretizerException):
+            q.decode(q.encode(self.arr)[:-1], self.arr.shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    CubeRootDiscretizer, SigmoidDiscretizer, FunctionDiscretizer, \
+    ColumnReader, ColumnWriter, write_column, discretizer_from_spec
+
+
+class TestSpec(unittest.TestCase):
+    def test_round_trip(self):
+        for d in (LinearDiscretizer(1, -10.0, 20.0),
+                  CubeRootDiscretizer(3, 0.0, 1.0),
+                  SigmoidDiscretizer(2, -5.0, 5.0, 20.0)):
+            spec = d.spec()
+            d2 = discretizer_from_spec(spec)
+            self.assertIs(type(d2), type(d))
+            self.assertEqual(d2.spec(), spec)
+
+    def test_invalid(self):
+        self.assertRaises(DiscretizerException, discretizer_from_spec, None)
+        self.assertRaises(DiscretizerException, discretizer_from_spec,
+                          {'type': 'Unknown'})
+        self.assertRaises(DiscretizerException, discretizer_from_spec,
+                          {'type': 'LinearDiscretizer', 'num_bytes': 1})
+        self.assertRaises(DiscretizerException, discretizer_from_spec,
+                          {'type': 'LinearDiscretizer', 'num_bytes': 9,
+                           'val_min': 0.0, 'val_max': 1.0})
+
+
+class TestColumns(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        d = SigmoidDiscretizer(3, -5.0, 5.0, 20.0)
+        vals = np.random.RandomState(0).uniform(-6.0, 6.0, 1000)
+        with ColumnWriter(self.path, d) as writer:
+            writer.append(vals[:400])
+            writer.append(vals[400:])
+            self.assertEqual(writer.count, 1000)
+
+        expected = d.decode_array(d.encode_array(vals))
+        with ColumnReader(self.path) as reader:
+            self.assertIsInstance(reader.discretizer, SigmoidDiscretizer)
+            self.assertEqual(reader.discretizer.spec(), d.spec())
+            self.assertEqual(len(reader), 1000)
+            self.assertEqual(reader.num_bytes, 3)
+            np.testing.assert_array_equal(reader[:], expected)
+            np.testing.assert_array_equal(reader[10:20], expected[10:20])
+            np.testing.assert_array_equal(reader[::7], expected[::7])
+            self.assertEqual(reader[5], expected[5])
+            self.assertEqual(reader[-1], expected[-1])
+            self.assertRaises(IndexError, reader.__getitem__, 1000)
+            self.assertRaises(DiscretizerException, reader.__getitem__, 'a')
+            raw = reader.raw(2, 4)
+            self.assertEqual(raw.tobytes(), d.encode_array(vals[2:4]).tobytes())
+            self.assertFalse(raw.flags.owndata)
+            self.assertEqual(reader.bucket_nums(0, 3).tolist(),
+                             d.vals_to_bucket_nums(vals[:3]).tolist())
+            arr = reader.array(100)
+            self.assertEqual(len(arr), 900)
+            self.assertEqual(arr[0], expected[100])
+            np.testing.assert_array_equal(np.asarray(arr), expected[100:])
+            del raw, arr
+
+    def test_close_with_views(self):
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        vals = np.linspace(0.0, 1.0, 10)
+        write_column(self.path, d, vals)
+        reader = ColumnReader(self.path)
+        with self.assertRaises(DiscretizerException):
+            with reader:
+                arr = reader.array()
+        # still open, and closes once the view is gone
+        np.testing.assert_array_equal(np.asarray(arr), reader[:])
+        self.assertEqual(reader.records.shape, (10, 1))
+        del arr
+        reader.close()
+        reader.close()
+
+    def test_empty(self):
+        write_column(self.path, LinearDiscretizer(1, 0.0, 1.0), [])
+        with ColumnReader(self.path) as reader:
+            self.assertEqual(len(reader), 0)
+            self.assertEqual(reader[:].size, 0)
+
+    def test_invalid(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'XXXX' + bytes(40))
+        self.assertRaises(DiscretizerException, ColumnReader, self.path)
+
+        write_column(self.path, LinearDiscretizer(2, 0.0, 1.0),
+                     np.linspace(0.0, 1.0, 10))
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(data[:-1])
+        self.assertRaises(DiscretizerException, ColumnReader, self.path)
+
+        with open(self.path, 'wb') as f:
+            pass
+        self.assertRaises(DiscretizerException, ColumnReader, self.path)
+
+    def test_no_spec(self):
+        # a discretizer without a spec leaves an existing file untouched
+        with open(self.path, 'wb') as f:
+            f.write(b'data')
+        d = FunctionDiscretizer(1, 0.0, 1.0, np.sqrt)
+        self.assertRaises(DiscretizerException, ColumnWriter, self.path, d)
+        self.assertRaises(DiscretizerException, write_column, self.path, d,
+                          [0.5])
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), b'data')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer
+from discretizer.compression import compress_buckets, decode_varints, \
+    decompress_buckets, encode_varints, zigzag_decode, zigzag_encode
+
+
+class TestPrimitives(unittest.TestCase):
+    def test_zigzag(self):
+        deltas = np.array([0, -1, 1, -2, 2, 2 ** 62, -2 ** 62],
+                          dtype=np.int64)
+        codes = zigzag_encode(deltas)
+        self.assertEqual(codes[:5].tolist(), [0, 1, 2, 3, 4])
+        np.testing.assert_array_equal(zigzag_decode(codes), deltas)
+
+    def test_varints(self):
+        vals = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 56, 2 ** 64 - 1]
+        buf = encode_varints(vals)
+        self.assertEqual(encode_varints([300]).tolist(), [0xAC, 0x02])
+        self.assertEqual(encode_varints([2 ** 64 - 1]).size, 10)
+        self.assertEqual(decode_varints(buf).tolist(), vals)
+        self.assertEqual(decode_varints(encode_varints([])).size, 0)
+        self.assertRaises(DiscretizerException, decode_varints,
+                          np.array([0x80], dtype=np.uint8))
+        self.assertRaises(DiscretizerException, decode_varints,
+                          np.array([0x80] * 10 + [1], dtype=np.uint8))
+
+
+class TestCompression(unittest.TestCase):
+    def signals(self):
+        rng = np.random.RandomState(0)
+        t = np.linspace(0.0, 2.0 * np.pi, 5000)
+        return {'smooth': np.sin(t) + rng.normal(0.0, 0.00001, t.size),
+                'noisy': rng.uniform(-1.0, 1.0, t.size),
+                'constant': np.full(t.size, 0.25),
+                'empty': np.zeros(0)}
+
+    def test_round_trip(self):
+        for name, vals in self.signals().items():
+            for num_bytes in (1, 2, 7):
+                d = LinearDiscretizer(num_bytes, -1.0, 1.0)
+                buckets = d.vals_to_bucket_nums(vals)
+                for method in ('delta', 'rle'):
+                    data = compress_buckets(buckets, method)
+                    self.assertIsInstance(data, bytes)
+                    np.testing.assert_array_equal(decompress_buckets(data),
+                                                  buckets)
+                    np.testing.assert_array_equal(
+                        d.decode_compressed(d.encode_compressed(vals,
+                                                                method)),
+                        d.decode_array(d.encode_array(vals)))
+
+    def test_ratio(self):
+        signals = self.signals()
+        d = LinearDiscretizer(2, -1.0, 1.0)
+        raw = signals['smooth'].size * d.num_bytes
+        self.assertLess(len(d.encode_compressed(signals['smooth'])),
+                        raw / 1.5)
+        self.assertLess(len(d.encode_compressed(signals['constant'], 'rle')),
+                        16)
+
+    def test_invalid(self):
+        self.assertRaises(DiscretizerException, compress_buckets, [1], 'zip')
+        self.assertRaises(DiscretizerException, decompress_buckets, b'')
+        self.assertRaises(DiscretizerException, decompress_buckets, b'\x09')
+        self.assertRaises(DiscretizerException, decompress_buckets, 1.5)
+        data = compress_buckets([1, 2, 3], 'delta')
+        self.assertRaises(DiscretizerException, decompress_buckets,
+                          data[:-1])
+        data = compress_buckets([1, 1, 3], 'rle')
+        self.assertRaises(DiscretizerException, decompress_buckets,
+                          data[:-1] + b'\x05')
+        # deltas going below zero
+        data = bytes([1, 2, 0, 1])
+        self.assertRaises(DiscretizerException, decompress_buckets, data)
+        # buckets above the maximum of the discretizer
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        self.assertRaises(DiscretizerException, d.decode_compressed,
+                          compress_buckets([256]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,14 @@
+import io
 import unittest
 
+import numpy as np
+
 import env
 from discretizer import BaseDiscretizer, DiscretizerException, \
     LinearDiscretizer, CubeRootDiscretizer, SigmoidDiscretizer
+from discretizer import discretizer_from_spec
+from discretizer.discretizers import buckets_to_buffer, buffer_to_uint8, \
+    pack_bits, unpack_bits
 
 
 # to run tests from the repository root directory:
@@ -12,6 +18,15 @@ from discretizer import BaseDiscretizer, DiscretizerException, \
 # > coverage run -m unittest discover -s tests -v; coverage report -m
 
 
+def _discretizers(num_bytes, num_bits=None):
+    # one of each mapping, the last one optionally narrower than whole bytes
+    return [LinearDiscretizer(num_bytes, -10.0, 20.0),
+            CubeRootDiscretizer(num_bytes, -10.0, 20.0),
+            SigmoidDiscretizer(num_bytes, -10.0, 20.0, 20.0),
+            SigmoidDiscretizer(num_bytes, -10.0, 20.0, 0.5,
+                               num_bits=num_bits)]
+
+
 class TestConversions(unittest.TestCase):
     def test_bytearray_to_bits(self):
         # 1 byte
@@ -216,6 +231,30 @@ class TestConversions(unittest.TestCase):
                           BaseDiscretizer.bytearray_to_bucket_num,
                           [0, 1, 2])
 
+    def test_packing_matches_bits(self):
+        for num_bytes in range(1, 8):
+            d = LinearDiscretizer(num_bytes, 0.0, 1.0)
+            for bn in (0, 1, 255, d.max_bucket // 3, d.max_bucket):
+                ba = BaseDiscretizer.bucket_num_to_bytearray(bn)
+                ba = bytearray(num_bytes - len(ba)) + ba
+                self.assertEqual(d._pack_bucket_num(bn), ba)
+                self.assertIsInstance(d._pack_bucket_num(bn), bytearray)
+                self.assertEqual(d._unpack_bucket_num(ba), bn)
+
+    def test_buffer_to_uint8(self):
+        arr = np.arange(12, dtype=np.uint8)
+        for buf in (arr, bytes(arr), bytearray(arr), memoryview(arr)):
+            np.testing.assert_array_equal(buffer_to_uint8(buf), arr)
+            np.testing.assert_array_equal(buffer_to_uint8(buf, 3),
+                                          arr.reshape(4, 3))
+        # record arrays and their strided views are not copied
+        records = arr.reshape(6, 2)[::2]
+        self.assertIs(buffer_to_uint8(records, 2), records)
+        self.assertRaises(DiscretizerException, buffer_to_uint8, arr, 5)
+        self.assertRaises(DiscretizerException, buffer_to_uint8,
+                          arr.astype(np.int8))
+        self.assertRaises(DiscretizerException, buffer_to_uint8, [1, 2])
+
 
 class TestLinearDiscretizer(unittest.TestCase):
     def test_basics(self):
@@ -413,5 +452,407 @@ class TestSigmoidDiscretizer(unittest.TestCase):
                           1, 0.0, 1.0, -1.0)
 
 
+class TestArrays(unittest.TestCase):
+    def test_encode_matches_scalar(self):
+        rng = np.random.RandomState(0)
+        vals = np.concatenate([rng.uniform(-12.0, 22.0, 2000),
+                               [-np.inf, -10.0, 5.0, 20.0, np.inf]])
+        for num_bytes in range(1, 8):
+            for d in _discretizers(num_bytes):
+                buf = d.encode_array(vals)
+                self.assertEqual(buf.dtype, np.uint8)
+                self.assertEqual(buf.size, vals.size * num_bytes)
+                expected = bytearray()
+                for v in vals:
+                    expected += d.encode(float(v))
+                self.assertEqual(bytearray(buf.tobytes()), expected)
+
+    def test_libm_mapping(self):
+        # the array form used for exact recomputation is bit-identical to
+        # the scalar mapping
+        v = np.concatenate([np.random.RandomState(1).uniform(0.0, 1.0, 5000),
+                            [0.5, np.nextafter(0.5, 0.0), 1e-300]])
+        for d in _discretizers(7)[1:]:
+            expected = [d.map_encoder(x) for x in v.tolist()]
+            self.assertEqual(d._libm_encoder_array(v).tolist(), expected)
+
+    def test_encode_boundaries(self):
+        # values that land exactly between two buckets
+        for d in _discretizers(2):
+            b = (np.arange(d.max_bucket) + 0.5) / d.max_bucket_float
+            v = np.array([d.map_decoder(x) for x in b[1:-1]])
+            vals = d.val_min + v * d.val_range
+            expected = [d.val_to_bucket_num(float(x)) for x in vals]
+            self.assertEqual(d.vals_to_bucket_nums(vals).tolist(), expected)
+
+    def test_decode_matches_scalar(self):
+        for num_bytes in (1, 2):
+            for d in _discretizers(num_bytes):
+                buckets = np.arange(d.num_buckets, dtype=np.uint64)
+                expected = [d.bucket_num_to_val(int(i)) for i in buckets]
+                vals = d.bucket_nums_to_vals(buckets)
+                np.testing.assert_allclose(vals, expected, rtol=1e-12,
+                                           atol=1e-12)
+                buf = bytearray()
+                for i in buckets:
+                    buf += d.bucket_num_to_bytearray(int(i)).rjust(
+                        num_bytes, b'\x00')
+                np.testing.assert_allclose(d.decode_array(buf), expected,
+                                           rtol=1e-12, atol=1e-12)
+
+    def test_decode_buffers(self):
+        d = LinearDiscretizer(3, 0.0, 100.0)
+        raw = bytes([0, 0, 0, 64, 0, 0, 255, 255, 255])
+        for buf in (raw, bytearray(raw), memoryview(raw),
+                    np.frombuffer(raw, dtype=np.uint8)):
+            vals = d.decode_array(buf)
+            self.assertEqual(vals.dtype, np.float64)
+            np.testing.assert_allclose(vals, [0.0, 25.0, 100.0], atol=1e-5)
+        self.assertEqual(d.decode_array(b'').size, 0)
+
+    def test_invalid(self):
+        d = LinearDiscretizer(2, 0.0, 1.0)
+        self.assertRaises(DiscretizerException, d.encode_array, [1, 2])
+        self.assertRaises(DiscretizerException, d.encode_array, ['a'])
+        self.assertRaises(DiscretizerException, d.encode_array, [np.nan])
+        self.assertRaises(DiscretizerException, d.decode_array, b'abc')
+        self.assertRaises(DiscretizerException, d.decode_array, 1.5)
+        self.assertRaises(DiscretizerException, d.decode_array,
+                          np.zeros(2, dtype=np.int32))
+        self.assertRaises(DiscretizerException, d.bucket_nums_to_vals,
+                          [65536])
+        self.assertRaises(DiscretizerException, d.bucket_nums_to_vals, [-1])
+        self.assertRaises(DiscretizerException, d.bucket_nums_to_vals, [0.5])
+
+
+class TestLookupTables(unittest.TestCase):
+    def test_defaults(self):
+        self.assertTrue(LinearDiscretizer(1, 0.0, 1.0).lookup_table)
+        self.assertTrue(LinearDiscretizer(2, 0.0, 1.0).lookup_table)
+        self.assertFalse(LinearDiscretizer(3, 0.0, 1.0).lookup_table)
+        self.assertIsNone(LinearDiscretizer(3, 0.0, 1.0).decode_table)
+        self.assertRaises(DiscretizerException,
+                          LinearDiscretizer(3, 0.0, 1.0).use_lookup_table)
+
+    def test_shared(self):
+        d1 = SigmoidDiscretizer(2, -5.0, 5.0, 20.0)
+        d2 = SigmoidDiscretizer(2, -5.0, 5.0, 20.0)
+        d3 = SigmoidDiscretizer(2, -5.0, 5.0, 10.0)
+        d4 = CubeRootDiscretizer(2, -5.0, 5.0)
+        self.assertIs(d1.decode_table, d2.decode_table)
+        self.assertIsNot(d1.decode_table, d3.decode_table)
+        self.assertIsNot(d1.decode_table, d4.decode_table)
+        self.assertFalse(d1.decode_table.flags.writeable)
+
+    def test_decode(self):
+        for d in (LinearDiscretizer(1, -10.0, 20.0),
+                  CubeRootDiscretizer(2, -10.0, 20.0),
+                  SigmoidDiscretizer(2, -10.0, 20.0, 20.0),
+                  SigmoidDiscretizer(2, -5.0, 5.0, 3.0)):
+            vals = np.linspace(-11.0, 21.0, 5001)
+            buf = d.encode_array(vals)
+            with_table = d.decode_array(buf)
+            # the table holds the scalar decoder's values exactly
+            np.testing.assert_array_equal(
+                d.decode_table, [d.bucket_num_to_val(i)
+                                 for i in range(d.num_buckets)])
+            expected = [d.bucket_num_to_val(int(b))
+                        for b in d.vals_to_bucket_nums(vals)]
+            scalar = [d.decode(bytearray(buf[i:i + d.num_bytes]))
+                      for i in range(0, buf.size, d.num_bytes)]
+            d.use_lookup_table(False)
+            self.assertIsNone(d.decode_table)
+            without_table = d.decode_array(buf)
+            np.testing.assert_array_equal(with_table, scalar)
+            np.testing.assert_array_equal(with_table, expected)
+            # numpy's mapping functions may differ in the last ulp
+            np.testing.assert_allclose(without_table, expected,
+                                       rtol=1e-12, atol=1e-12)
+            for i in range(0, buf.size, 97 * d.num_bytes):
+                ba = bytearray(buf[i:i + d.num_bytes])
+                self.assertEqual(d.decode(ba), scalar[i // d.num_bytes])
+                self.assertEqual(d.decode(ba), d.bucket_num_to_val(
+                    d._unpack_bucket_num(ba)))
+
+
+class TestEncodeTables(unittest.TestCase):
+    def test_engines(self):
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        self.assertEqual(d.encode_engine, 'map')
+        self.assertIsNone(d.bucket_edges)
+        d.use_encode_engine('table')
+        self.assertEqual(d.encode_engine, 'table')
+        self.assertEqual(d.bucket_edges.size, d.max_bucket)
+        self.assertRaises(DiscretizerException, d.use_encode_engine, 'abc')
+        self.assertRaises(DiscretizerException,
+                          LinearDiscretizer(3, 0.0, 1.0).use_encode_engine,
+                          'table')
+
+    def test_boundaries(self):
+        for num_bytes in (1, 2):
+            for d in _discretizers(num_bytes):
+                d.use_encode_engine('table')
+                edges = d.bucket_edges
+                below = np.nextafter(edges, -np.inf)
+                self.assertTrue(np.all(np.diff(edges) >= 0.0))
+                step = 1 if num_bytes == 1 else 61
+                for i in range(0, edges.size, step):
+                    for x in (float(edges[i]), float(below[i])):
+                        self.assertEqual(d.encode(x),
+                                         d._pack_bucket_num(
+                                             d.val_to_bucket_num(x)))
+                vals = np.concatenate([edges, below])
+                np.testing.assert_array_equal(d.encode_array(vals),
+                                              buckets_to_buffer(
+                                                  d.vals_to_bucket_nums(vals),
+                                                  num_bytes))
+
+    def test_encode(self):
+        vals = np.concatenate([np.linspace(-12.0, 22.0, 3001),
+                               [-np.inf, np.inf]])
+        for d in _discretizers(1):
+            expected = d.encode_array(vals)
+            d.use_encode_engine('table')
+            np.testing.assert_array_equal(d.encode_array(vals), expected)
+            self.assertRaises(DiscretizerException, d.encode, 1)
+            self.assertRaises(DiscretizerException, d.encode_array, [1])
+            self.assertRaises(DiscretizerException, d.encode_array, [np.nan])
+
+
+class ShortReader(object):
+    # file-like object returning at most 5 bytes per read
+    def __init__(self, data):
+        self.f = io.BytesIO(data)
+
+    def read(self, size):
+        return self.f.read(min(size, 5))
+
+
+class TestStreams(unittest.TestCase):
+    def test_encode_stream(self):
+        d = SigmoidDiscretizer(3, -5.0, 5.0, 20.0)
+        vals = np.random.RandomState(0).uniform(-6.0, 6.0, 1001)
+        expected = d.encode_array(vals).tobytes()
+        for source in (vals, vals.tolist(), iter(vals.tolist())):
+            chunks = list(d.encode_stream(source, chunk_size=100))
+            self.assertEqual(len(chunks), 11)
+            self.assertEqual(len(chunks[-1]), 3)
+            self.assertEqual(b''.join(chunks), expected)
+        self.assertEqual(list(d.encode_stream([])), [])
+        self.assertRaises(DiscretizerException, list,
+                          d.encode_stream(vals, chunk_size=0))
+
+        # items are checked like encode_array() values
+        self.assertRaises(DiscretizerException, list, d.encode_stream([0, 1]))
+        self.assertRaises(DiscretizerException, list,
+                          d.encode_stream(iter([0.5, 'a'])))
+        self.assertRaises(DiscretizerException, list,
+                          d.encode_stream([0.5, None]))
+        chunks = d.encode_stream(vals.tolist()[:100] + [1, 2], chunk_size=100)
+        self.assertEqual(next(chunks), expected[:300])
+        self.assertRaises(DiscretizerException, next, chunks)
+
+    def test_decode_stream(self):
+        d = SigmoidDiscretizer(3, -5.0, 5.0, 20.0)
+        vals = np.random.RandomState(0).uniform(-6.0, 6.0, 1001)
+        data = d.encode_array(vals).tobytes()
+        expected = d.decode_array(data)
+        for f in (io.BytesIO(data), ShortReader(data)):
+            chunks = list(d.decode_stream(f, chunk_size=100))
+            self.assertEqual([c.size for c in chunks], [100] * 10 + [1])
+            np.testing.assert_array_equal(np.concatenate(chunks), expected)
+        self.assertEqual(list(d.decode_stream(io.BytesIO(b''))), [])
+        self.assertRaises(DiscretizerException, list,
+                          d.decode_stream(io.BytesIO(data[:-1])))
+
+
+class TestBitWidths(unittest.TestCase):
+    def test_basics(self):
+        d = LinearDiscretizer(None, -10.0, 20.0, num_bits=12)
+        self.assertEqual(d.num_bits, 12)
+        self.assertEqual(d.num_bytes, 2)
+        self.assertEqual(d.num_buckets, 4096)
+        self.assertEqual(d.max_bucket, 4095)
+        d = SigmoidDiscretizer(2, -10.0, 20.0, 20.0, num_bits=9)
+        self.assertEqual(d.num_bits, 9)
+        self.assertEqual(LinearDiscretizer(3, 0.0, 1.0).num_bits, 24)
+        self.assertEqual(
+            LinearDiscretizer(None, 0.0, 1.0, num_bits=56).num_bytes, 7)
+
+        self.assertRaises(DiscretizerException, LinearDiscretizer,
+                          None, 0.0, 1.0)
+        self.assertRaises(DiscretizerException, LinearDiscretizer,
+                          None, 0.0, 1.0, num_bits=0)
+        self.assertRaises(DiscretizerException, LinearDiscretizer,
+                          None, 0.0, 1.0, num_bits=57)
+        self.assertRaises(DiscretizerException, LinearDiscretizer,
+                          None, 0.0, 1.0, num_bits=1.5)
+        self.assertRaises(DiscretizerException, LinearDiscretizer,
+                          1, 0.0, 1.0, num_bits=12)
+
+    def test_scalar(self):
+        d = LinearDiscretizer(None, 0.0, 1.0, num_bits=12)
+        self.assertEqual(d.encode(1.0), bytearray([15, 255]))
+        self.assertEqual(d.encode(0.5), bytearray([8, 0]))
+        self.assertEqual(d.decode(bytearray([15, 255])), 1.0)
+        self.assertRaises(DiscretizerException, d.decode,
+                          bytearray([16, 0]))
+        self.assertRaises(DiscretizerException, d.decode_array,
+                          bytes([16, 0]))
+        self.assertRaises(DiscretizerException, d.bucket_num_to_val, 4096)
+
+    def test_packed(self):
+        vals = np.random.RandomState(0).uniform(-11.0, 21.0, 1001)
+        for num_bits in (1, 3, 7, 8, 12, 13, 24, 31, 53, 56):
+            for d in (LinearDiscretizer(None, -10.0, 20.0, num_bits=num_bits),
+                      CubeRootDiscretizer(None, -10.0, 20.0,
+                                          num_bits=num_bits)):
+                buf = d.encode_packed(vals)
+                self.assertEqual(buf.size, (1001 * num_bits + 7) // 8)
+                self.assertEqual(buf.size, d.packed_size(1001))
+                buckets = d.vals_to_bucket_nums(vals)
+                bits = ''.join(bin(int(b))[2:].zfill(num_bits)
+                               for b in buckets)
+                bits += '0' * (-len(bits) % 8)
+                self.assertEqual(buf.tolist(),
+                                 [int(bits[i:i + 8], 2)
+                                  for i in range(0, len(bits), 8)])
+                np.testing.assert_array_equal(
+                    d.decode_packed(buf, 1001),
+                    d.decode_array(d.encode_array(vals)))
+
+        d = LinearDiscretizer(None, 0.0, 1.0, num_bits=3)
+        buf = d.encode_packed([0.0, 1.0])
+        self.assertEqual(buf.tolist(), [0b00011100])
+        self.assertEqual(d.decode_packed(buf, 2).tolist(), [0.0, 1.0])
+        self.assertEqual(d.decode_packed(buf, 1).tolist(), [0.0])
+        self.assertEqual(d.decode_packed(b'').size, 0)
+        self.assertRaises(DiscretizerException, d.decode_packed, buf, 3)
+        self.assertRaises(DiscretizerException, d.decode_packed, buf, -1)
+
+        # counts that leave the last byte partly empty are not guessed
+        for num_bits, count in ((1, 3), (3, 3), (7, 1)):
+            d = LinearDiscretizer(None, 0.0, 1.0, num_bits=num_bits)
+            buf = d.encode_packed([0.9] * count)
+            self.assertRaises(DiscretizerException, d.decode_packed, buf)
+            self.assertEqual(d.decode_packed(buf, count).tolist(),
+                             [d.decode_array(d.encode_array([0.9]))[0]] *
+                             count)
+        d = LinearDiscretizer(None, 0.0, 1.0, num_bits=12)
+        buf = d.encode_packed([0.9] * 3)
+        self.assertEqual(buf.size, 5)
+        self.assertEqual(d.decode_packed(buf).size, 3)
+
+    def test_chunks(self):
+        buckets = np.random.RandomState(0).randint(0, 2 ** 13, 1003)
+        buf = pack_bits(buckets, 13, chunk_size=20)
+        np.testing.assert_array_equal(buf, pack_bits(buckets, 13))
+        np.testing.assert_array_equal(unpack_bits(buf, 13, 1003,
+                                                  chunk_size=20), buckets)
+
+    def test_spec(self):
+        d = SigmoidDiscretizer(None, -5.0, 5.0, 10.0, num_bits=12)
+        self.assertEqual(d.spec()['num_bits'], 12)
+        self.assertNotIn('num_bits', SigmoidDiscretizer(
+            2, -5.0, 5.0, 10.0).spec())
+        d2 = discretizer_from_spec(d.spec())
+        self.assertEqual(d2.num_bits, 12)
+        self.assertIsNot(d.decode_table, SigmoidDiscretizer(
+            2, -5.0, 5.0, 10.0).decode_table)
+
+
+class TestFastCodec(unittest.TestCase):
+    def test_equivalence(self):
+        vals = np.concatenate([
+            np.random.RandomState(0).uniform(-12.0, 22.0, 500),
+            [-np.inf, -10.0, 5.0, 20.0, np.inf]]).tolist()
+        for num_bytes in (1, 2, 3, 7):
+            for d in _discretizers(num_bytes, 8 * num_bytes - 3):
+                engines = ['map']
+                if num_bytes <= 2:
+                    engines.append('table')
+                for engine in engines:
+                    d.use_encode_engine(engine)
+                    for lookup in (True, False):
+                        if num_bytes <= 2:
+                            d.use_lookup_table(lookup)
+                        for validate in (True, False):
+                            encode, decode = d.fast_codec(validate)
+                            for val in vals:
+                                ba = encode(val)
+                                self.assertIsInstance(ba, bytearray)
+                                self.assertEqual(ba, d.encode(val))
+                                self.assertEqual(decode(ba), d.decode(ba))
+
+    def test_validation(self):
+        d = LinearDiscretizer(None, 0.0, 1.0, num_bits=12)
+        encode, decode = d.fast_codec()
+        self.assertRaises(DiscretizerException, encode, 1)
+        self.assertRaises(DiscretizerException, encode, float('nan'))
+        self.assertRaises(DiscretizerException, decode, b'ab')
+        self.assertRaises(DiscretizerException, decode, bytearray(3))
+        self.assertRaises(DiscretizerException, decode, bytearray([16, 0]))
+        encode, decode = d.fast_codec(validate=False)
+        self.assertEqual(encode(1), d.encode(1.0))
+        self.assertEqual(decode(b'\x0f\xff'), 1.0)
+
+
+class TestIntegerArrays(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(5)
+        self.vals = rng.uniform(-12.0, 22.0, 1000)
+
+    def test_dtypes(self):
+        expected = {1: 1, 2: 2, 3: 4, 4: 4, 5: 8, 6: 8, 7: 8}
+        for num_bytes, size in expected.items():
+            d = LinearDiscretizer(num_bytes, -10.0, 20.0)
+            self.assertEqual(d.int_dtype('big'),
+                             np.dtype('>u%d' % size))
+            self.assertEqual(d.int_dtype('little'),
+                             np.dtype('<u%d' % size))
+            self.assertEqual(d.int_dtype(), np.dtype('u%d' % size))
+        with self.assertRaises(DiscretizerException):
+            d.int_dtype('middle')
+
+    def test_round_trip(self):
+        for num_bytes in range(1, 8):
+            d = SigmoidDiscretizer(num_bytes, -10.0, 20.0, 20.0)
+            buf = d.encode_array(self.vals)
+            expected = d.vals_to_bucket_nums(self.vals)
+            for byteorder in ('big', 'little', 'native'):
+                ints = d.encode_ints(self.vals, byteorder)
+                self.assertEqual(ints.dtype, d.int_dtype(byteorder))
+                np.testing.assert_array_equal(ints, expected)
+                np.testing.assert_array_equal(
+                    d.buffer_to_ints(buf, byteorder), expected)
+                np.testing.assert_array_equal(d.ints_to_buffer(ints), buf)
+                np.testing.assert_array_equal(d.decode_ints(ints),
+                                              d.decode_array(buf))
+
+    def test_zero_copy(self):
+        for num_bytes in (1, 2, 4):
+            d = LinearDiscretizer(num_bytes, -10.0, 20.0)
+            buf = d.encode_array(self.vals)
+            ints = d.buffer_to_ints(buf)
+            self.assertTrue(np.shares_memory(ints, buf))
+            self.assertTrue(np.shares_memory(d.ints_to_buffer(ints), buf))
+        d = LinearDiscretizer(3, -10.0, 20.0)
+        buf = d.encode_array(self.vals)
+        self.assertFalse(np.shares_memory(d.buffer_to_ints(buf), buf))
+
+    def test_invalid(self):
+        d = LinearDiscretizer(2, -10.0, 20.0, num_bits=10)
+        with self.assertRaises(DiscretizerException):
+            d.ints_to_buffer(np.array([1024]))
+        with self.assertRaises(DiscretizerException):
+            d.ints_to_buffer(np.array([-1]))
+        with self.assertRaises(DiscretizerException):
+            d.ints_to_buffer(np.array([1.0]))
+        with self.assertRaises(DiscretizerException):
+            d.buffer_to_ints(bytearray(3))
+        with self.assertRaises(DiscretizerException):
+            d.decode_ints(np.array([1024], dtype=np.uint16))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    SigmoidDiscretizer, DistanceKernel
+from discretizer import distances
+
+
+def reference(query, decoded, metric):
+    if metric == 'l2':
+        return np.square(decoded - query).sum(axis=1)
+    if metric == 'l1':
+        return np.abs(decoded - query).sum(axis=1)
+    return (decoded * query).sum(axis=1)
+
+
+class TestDistanceKernel(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.vectors = rng.uniform(-1.0, 1.0, (1000, 12))
+        self.query = rng.uniform(-1.0, 1.0, 12)
+        self.kernels = [
+            DistanceKernel(LinearDiscretizer(1, -1.0, 1.0), 12),
+            DistanceKernel(LinearDiscretizer(2, -1.0, 1.0, num_bits=12), 12),
+            DistanceKernel([LinearDiscretizer(1, -1.0, 1.0),
+                            SigmoidDiscretizer(1, -1.0, 1.0, 4.0)] * 6)]
+
+    def test_encode_decode(self):
+        for k in self.kernels:
+            buf = k.encode(self.vectors)
+            self.assertEqual(buf.size, self.vectors.shape[0] * k.record_size)
+            self.assertEqual(k.count(buf), self.vectors.shape[0])
+            decoded = k.decode(buf)
+            for i, d in enumerate(k.discretizers):
+                col = d.decode_array(d.encode_array(self.vectors[:, i]))
+                self.assertTrue(np.array_equal(decoded[:, i], col))
+            codes = k.codes(buf, 10, 20)
+            self.assertEqual(codes.shape, (10, 12))
+            self.assertTrue(np.array_equal(
+                k.values[np.arange(12), codes], decoded[10:20]))
+
+    def test_distances(self):
+        for k in self.kernels:
+            buf = k.encode(self.vectors)
+            decoded = k.decode(buf)
+            for metric in distances.METRICS:
+                dist = k.distances(self.query, buf, metric)
+                self.assertTrue(np.allclose(
+                    dist, reference(self.query, decoded, metric)))
+                chunked = k.distances(self.query, bytes(buf), metric,
+                                      chunk_size=77)
+                self.assertTrue(np.allclose(dist, chunked))
+
+    def test_value_gather(self):
+        # without per-query tables the decoded values are gathered instead
+        k = self.kernels[1]
+        buf = k.encode(self.vectors)
+        limit = distances.QUERY_TABLE_MAX_ENTRIES
+        try:
+            distances.QUERY_TABLE_MAX_ENTRIES = 0
+            gathered = [k.distances(self.query, buf, m)
+                        for m in distances.METRICS]
+        finally:
+            distances.QUERY_TABLE_MAX_ENTRIES = limit
+        for metric, dist in zip(distances.METRICS, gathered):
+            self.assertTrue(np.allclose(
+                dist, k.distances(self.query, buf, metric)))
+
+    def test_search(self):
+        for k in self.kernels:
+            buf = k.encode(self.vectors)
+            for metric in distances.METRICS:
+                dist = k.distances(self.query, buf, metric)
+                order = np.argsort(-dist if metric == 'dot' else dist,
+                                   kind='stable')
+                for num in (1, 10, 2000):
+                    idx, found = k.search(self.query, buf, num, metric,
+                                          chunk_size=64)
+                    self.assertEqual(idx.size, min(num, dist.size))
+                    self.assertTrue(np.allclose(found, dist[idx]))
+                    self.assertTrue(np.allclose(dist[idx],
+                                                dist[order[:idx.size]]))
+        idx, found = self.kernels[0].search(self.query,
+                                            np.zeros(0, dtype=np.uint8), 5)
+        self.assertEqual(idx.size, 0)
+        self.assertEqual(found.size, 0)
+
+    def test_invalid(self):
+        d = LinearDiscretizer(1, -1.0, 1.0)
+        k = DistanceKernel(d, 4)
+        buf = k.encode(self.vectors[:, :4])
+        with self.assertRaises(DiscretizerException):
+            DistanceKernel(d)
+        with self.assertRaises(DiscretizerException):
+            DistanceKernel([])
+        with self.assertRaises(DiscretizerException):
+            DistanceKernel([d, d], 3)
+        with self.assertRaises(DiscretizerException):
+            DistanceKernel([d, LinearDiscretizer(2, -1.0, 1.0)])
+        with self.assertRaises(DiscretizerException):
+            DistanceKernel(LinearDiscretizer(3, -1.0, 1.0), 4)
+        with self.assertRaises(DiscretizerException):
+            k.encode(self.vectors[:, :3])
+        with self.assertRaises(DiscretizerException):
+            k.distances(self.query[:3], buf)
+        with self.assertRaises(DiscretizerException):
+            k.distances(self.query[:4], buf, 'cosine')
+        with self.assertRaises(DiscretizerException):
+            k.distances([np.nan, 0.0, 0.0, 0.0], buf)
+        with self.assertRaises(DiscretizerException):
+            k.distances(self.query[:4], buf[:-1])
+        with self.assertRaises(DiscretizerException):
+            k.distances(self.query[:4], buf, chunk_size=0)
+        with self.assertRaises(DiscretizerException):
+            k.search(self.query[:4], buf, 0)
+        with self.assertRaises(DiscretizerException):
+            k.decode(buf.astype(np.int8))
+        # bucket numbers above the maximum of a partial width
+        k = DistanceKernel(LinearDiscretizer(2, -1.0, 1.0, num_bits=12), 2)
+        with self.assertRaises(DiscretizerException):
+            k.decode(np.full(4, 255, dtype=np.uint8))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import pickle
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, CubeRootDiscretizer, \
+    FunctionDiscretizer, BucketAggregate
+
+
+def log_curve(v):
+    return np.log1p(100.0 * v)
+
+
+class TestFunctionDiscretizer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.vals = rng.uniform(-12.0, 22.0, 5000)
+
+    def test_matches_builtin(self):
+        # the cube root mapping as a plain function gives the same buckets
+        def cube_root(v):
+            x = (v - 0.5) * 0.25
+            return np.copysign(np.power(np.abs(x), 1.0 / 3.0), x) + 0.5
+
+        for num_bytes in (1, 2, 3):
+            d = FunctionDiscretizer(num_bytes, -10.0, 20.0, cube_root)
+            ref = CubeRootDiscretizer(num_bytes, -10.0, 20.0)
+            expected = ref.vals_to_bucket_nums(self.vals)
+            np.testing.assert_array_equal(d.vals_to_bucket_nums(self.vals),
+                                          expected)
+            tol = 30.0 / (d.num_buckets - 1)
+            np.testing.assert_allclose(d.decode_array(ref.encode_array(
+                self.vals)), ref.decode_array(ref.encode_array(self.vals)),
+                atol=tol)
+
+    def test_scalar_and_batch(self):
+        for num_bytes in (1, 2, 4):
+            d = FunctionDiscretizer(num_bytes, -10.0, 20.0, log_curve)
+            buf = d.encode_array(self.vals)
+            scalar = bytearray().join(d.encode(v) for v in self.vals.tolist())
+            self.assertEqual(bytes(buf), bytes(scalar))
+            decoded = d.decode_array(buf)
+            n = d.num_bytes
+            for i in range(0, 200):
+                self.assertAlmostEqual(
+                    d.decode(bytearray(buf[i * n:(i + 1) * n])), decoded[i],
+                    places=9)
+            encode, decode = d.fast_codec()
+            self.assertEqual(encode(3.0), d.encode(3.0))
+
+    def test_inverse(self):
+        d = FunctionDiscretizer(2, 0.0, 1.0, log_curve)
+        b = np.linspace(0.0, 1.0, 1001)
+        v = d.map_decoder_array(b)
+        np.testing.assert_allclose(d.map_encoder_array(v), b, atol=1e-14)
+        self.assertEqual(d.map_decoder(0.0), 0.0)
+        self.assertEqual(d.map_decoder(1.0), 1.0)
+        for x in (0.001, 0.25, 0.5, 0.999):
+            self.assertEqual(d.map_decoder(x), float(d.map_decoder_array(x)))
+
+        # decoded values re-encode to their own bucket, also for steep
+        # curves and at widths finer than the inverse table
+        rng = np.random.RandomState(1)
+        cases = [(num_bytes, func) for num_bytes in (1, 2, 3, 4)
+                 for func in (log_curve, np.sqrt, np.cbrt,
+                              lambda v: np.log1p(1e6 * v))]
+        for num_bytes, func in cases:
+            d = FunctionDiscretizer(num_bytes, 0.0, 1.0, func)
+            if d.num_buckets <= 1 << 16:
+                bucket_nums = np.arange(d.num_buckets, dtype=np.uint64)
+            else:
+                bucket_nums = np.concatenate([
+                    np.arange(1000), d.max_bucket - np.arange(1000),
+                    rng.randint(0, d.max_bucket, 100000, dtype=np.int64)])
+                bucket_nums = bucket_nums.astype(np.uint64)
+            np.testing.assert_array_equal(
+                d.vals_to_bucket_nums(d.bucket_nums_to_vals(bucket_nums)),
+                bucket_nums)
+            for bucket_num in bucket_nums[::9973].tolist():
+                self.assertEqual(d.val_to_bucket_num(
+                    d.bucket_num_to_val(bucket_num)), bucket_num)
+
+    def test_invalid(self):
+        with self.assertRaises(DiscretizerException):
+            FunctionDiscretizer(1, 0.0, 1.0, 'log')
+        with self.assertRaises(DiscretizerException):
+            FunctionDiscretizer(1, 0.0, 1.0, lambda v: 1.0 - v)
+        with self.assertRaises(DiscretizerException):
+            FunctionDiscretizer(1, 0.0, 1.0, lambda v: np.minimum(v, 0.5))
+        with self.assertRaises(DiscretizerException):
+            FunctionDiscretizer(1, 0.0, 1.0,
+                                lambda v: np.where(v < 0.5, np.nan, v))
+        with self.assertRaises(DiscretizerException):
+            FunctionDiscretizer(1, 0.0, 1.0, lambda v: 0.5)
+        with self.assertRaises(DiscretizerException):
+            FunctionDiscretizer(1, 0.0, 1.0, log_curve).spec()
+
+    def test_pickle_and_aggregate(self):
+        d = FunctionDiscretizer(2, -10.0, 20.0, log_curve)
+        d.decode_array(d.encode_array(self.vals))
+        copy = pickle.loads(pickle.dumps(d))
+        np.testing.assert_array_equal(copy.encode_array(self.vals),
+                                      d.encode_array(self.vals))
+        agg = BucketAggregate(d, d.encode_array(self.vals[:100]))
+        agg.merge(BucketAggregate(d, d.encode_array(self.vals[100:])))
+        self.assertEqual(agg.count(), self.vals.size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import pickle
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    SigmoidDiscretizer
+from discretizer.parallel import MIN_CHUNK_SIZE, SharedArray, get_pool, \
+    parallel_encode_array, shutdown_pool
+
+
+class TestParallel(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_pool()
+
+    def test_pickle(self):
+        d = SigmoidDiscretizer(2, -5.0, 5.0, 20.0)
+        d.use_encode_engine('table')
+        d.encode(1.0)
+        d.decode(bytearray(2))
+        data = pickle.dumps(d)
+        self.assertLess(len(data), 1024)
+        d2 = pickle.loads(data)
+        self.assertEqual(d2.spec(), d.spec())
+        self.assertEqual(d2.encode_engine, 'table')
+        self.assertEqual(d2.encode(1.0), d.encode(1.0))
+
+    def test_encode(self):
+        vals = np.random.RandomState(0).uniform(-6.0, 6.0,
+                                                3 * MIN_CHUNK_SIZE + 7)
+        for d in (LinearDiscretizer(3, -5.0, 5.0),
+                  SigmoidDiscretizer(2, -5.0, 5.0, 20.0)):
+            expected = d.encode_array(vals)
+            np.testing.assert_array_equal(d.encode_array(vals, workers=2),
+                                          expected)
+            with ProcessPoolExecutor(max_workers=2) as pool:
+                np.testing.assert_array_equal(
+                    parallel_encode_array(d, vals, 2, executor=pool),
+                    expected)
+
+        # the pool is kept between calls
+        self.assertIs(get_pool(2), get_pool(2))
+        self.assertIsNot(get_pool(3), get_pool(2))
+
+        # small inputs are encoded in process
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        np.testing.assert_array_equal(d.encode_array(vals[:10], workers=4),
+                                      d.encode_array(vals[:10]))
+
+    def test_shared(self):
+        vals = np.random.RandomState(1).uniform(-6.0, 6.0,
+                                                3 * MIN_CHUNK_SIZE + 7)
+        d = SigmoidDiscretizer(2, -5.0, 5.0, 20.0)
+        expected = d.encode_array(vals)
+        with SharedArray.from_values(vals) as shared_in, \
+                SharedArray(vals.size * 2, np.uint8) as shared_out:
+            np.testing.assert_array_equal(shared_in.array, vals)
+            out = parallel_encode_array(d, shared_in, 2, out=shared_out)
+            self.assertTrue(np.shares_memory(out, shared_out.array))
+            np.testing.assert_array_equal(out, expected)
+            np.testing.assert_array_equal(d.encode_array(shared_in),
+                                          expected)
+            np.testing.assert_array_equal(
+                d.encode_array(shared_in, workers=2), expected)
+            del out
+
+            # in process for small inputs, into the output all the same
+            small = SharedArray(2, np.uint8)
+            try:
+                out = parallel_encode_array(d, vals[:1], 2, out=small)
+                np.testing.assert_array_equal(out, expected[:2])
+                del out
+            finally:
+                small.close()
+                small.unlink()
+
+            self.assertRaises(DiscretizerException, parallel_encode_array,
+                              d, shared_in, 2, out=shared_out.array)
+            self.assertRaises(DiscretizerException, parallel_encode_array,
+                              d, vals[:-1], 2, out=shared_out)
+        with SharedArray(10, np.float32) as shared:
+            self.assertRaises(DiscretizerException, parallel_encode_array,
+                              d, shared, 2)
+        self.assertRaises(DiscretizerException, SharedArray, -1, np.uint8)
+
+    def test_invalid(self):
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        self.assertRaises(DiscretizerException, d.encode_array, [0.5],
+                          workers=0)
+        self.assertRaises(DiscretizerException, d.encode_array, [0.5],
+                          workers=1.5)
+        self.assertRaises(DiscretizerException, d.encode_array, [1, 2],
+                          workers=2)
+        vals = np.zeros(3 * MIN_CHUNK_SIZE)
+        vals[-1] = np.nan
+        self.assertRaises(DiscretizerException, d.encode_array, vals,
+                          workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    SigmoidDiscretizer
+from discretizer.planner import bucket_errors, plan_discretizer, \
+    reconstruction_error
+
+
+class TestPlanner(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.vals = rng.uniform(-10.0, 20.0, 100000)
+
+    def test_bucket_errors(self):
+        d = LinearDiscretizer(1, -10.0, 20.0)
+        bucket_nums, errors = bucket_errors(d)
+        self.assertEqual(bucket_nums.size, 256)
+        half = 15.0 / 255
+        np.testing.assert_allclose(errors[1:-1], half)
+        self.assertLessEqual(errors.max(), half + 1e-12)
+
+        # measured errors never exceed the worst case
+        for d in (d, SigmoidDiscretizer(2, -10.0, 20.0, 20.0),
+                  SigmoidDiscretizer(5, -10.0, 20.0, 20.0)):
+            measured = np.abs(d.decode_array(d.encode_array(self.vals)) -
+                              self.vals).max()
+            self.assertLessEqual(measured,
+                                 reconstruction_error(d) * (1 + 1e-6))
+            self.assertAlmostEqual(reconstruction_error(d, sample=self.vals),
+                                   measured)
+
+    def test_absolute(self):
+        d, error = plan_discretizer(-10.0, 20.0, 0.01)
+        self.assertEqual(d.num_bytes, 2)
+        self.assertLessEqual(error, 0.01)
+        measured = np.abs(d.decode_array(d.encode_array(self.vals)) -
+                          self.vals).max()
+        self.assertLessEqual(measured, 0.01)
+
+        d, error = plan_discretizer(-10.0, 20.0, 0.01, whole_bytes=False)
+        self.assertEqual(d.num_bits, 11)
+        self.assertGreater(reconstruction_error(
+            LinearDiscretizer(2, -10.0, 20.0, num_bits=10)), 0.01)
+
+    def test_region(self):
+        # a narrow region of interest favours a sharp sigmoid
+        d, error = plan_discretizer(-10.0, 20.0, 1e-4, region=(4.0, 6.0),
+                                    whole_bytes=False)
+        self.assertIsInstance(d, SigmoidDiscretizer)
+        wide, _ = plan_discretizer(-10.0, 20.0, 1e-4, whole_bytes=False)
+        self.assertLess(d.num_bits, wide.num_bits)
+        inside = self.vals[(self.vals >= 4.0) & (self.vals <= 6.0)]
+        self.assertLessEqual(np.abs(d.decode_array(d.encode_array(inside)) -
+                                    inside).max(), 1e-4)
+
+    def test_relative(self):
+        d, error = plan_discretizer(1.0, 1000.0, 1e-3, relative=True)
+        vals = np.exp(np.random.RandomState(1).uniform(0.0, np.log(1000.0),
+                                                       10000))
+        rel = np.abs(d.decode_array(d.encode_array(vals)) - vals) / vals
+        self.assertLessEqual(rel.max(), 1e-3)
+        # values around zero have no relative error bound
+        with self.assertRaises(DiscretizerException):
+            plan_discretizer(-10.0, 20.0, 1e-3, relative=True)
+
+    def test_sample(self):
+        sample = np.random.RandomState(2).normal(5.0, 0.5, 10000)
+        d, error = plan_discretizer(-10.0, 20.0, 1e-3, sample=sample,
+                                    whole_bytes=False)
+        self.assertAlmostEqual(error, reconstruction_error(d, sample=sample))
+        self.assertLessEqual(error, 1e-3)
+        full, _ = plan_discretizer(-10.0, 20.0, 1e-3, whole_bytes=False)
+        self.assertLessEqual(d.num_bits, full.num_bits)
+
+    def test_invalid(self):
+        with self.assertRaises(DiscretizerException):
+            plan_discretizer(-10.0, 20.0, 0)
+        with self.assertRaises(DiscretizerException):
+            plan_discretizer(-10.0, 20.0, 0.1, region=(2.0, 1.0))
+        with self.assertRaises(DiscretizerException):
+            plan_discretizer(-10.0, 20.0, 1e-20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    SigmoidDiscretizer, PredictiveCodec
+
+
+class TestPredictiveCodec(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        t = np.linspace(0.0, 4.0 * np.pi, 5000)
+        self.vals = 50.0 * np.sin(t) + rng.normal(0.0, 0.05, t.size)
+        self.codec = PredictiveCodec(LinearDiscretizer(2, -100.0, 100.0),
+                                     SigmoidDiscretizer(1, -1.0, 1.0, 10.0),
+                                     keyframe_interval=100)
+
+    def reference(self, codec, vals):
+        # sample by sample reconstruction with the scalar API
+        out = []
+        for i, val in enumerate(vals.tolist()):
+            if i % codec.keyframe_interval == 0:
+                recon = codec.keyframe.decode(codec.keyframe.encode(val))
+            else:
+                recon = recon + codec.residual.decode(
+                    codec.residual.encode(val - recon))
+            out.append(recon)
+        return np.array(out)
+
+    def test_round_trip(self):
+        codec = self.codec
+        for count in (5000, 4999, 4901, 4900, 1, 0):
+            vals = self.vals[:count]
+            buf = codec.encode_array(vals)
+            self.assertEqual(buf.size, codec.encoded_size(count))
+            self.assertEqual(codec.count(buf.size), count)
+            decoded = codec.decode_array(buf)
+            np.testing.assert_array_equal(decoded,
+                                          self.reference(codec, vals))
+
+        buf = codec.encode_array(self.vals)
+        # close to half the bytes of the plain keyframe encoding
+        self.assertLess(buf.size, 0.52 * self.vals.size * 2)
+        # errors stay bounded by the residual buckets, they do not drift
+        err = np.abs(codec.decode_array(buf) - self.vals)
+        self.assertLess(err.max(), 0.05)
+
+    def test_seek(self):
+        buf = self.codec.encode_array(self.vals)
+        decoded = self.codec.decode_array(buf)
+        for start, stop in ((0, 10), (95, 205), (4990, None), (-3, None),
+                            (300, 300), (None, None)):
+            np.testing.assert_array_equal(
+                self.codec.decode_array(buf, start, stop),
+                decoded[start:stop])
+
+    def test_clamped_residuals(self):
+        # a step far beyond the residual range is caught up on and the
+        # error then returns to the residual resolution
+        vals = np.concatenate([np.zeros(50), np.full(50, 10.0)])
+        decoded = self.codec.decode_array(self.codec.encode_array(vals))
+        self.assertGreater(abs(decoded[50] - 10.0), 1.0)
+        self.assertLess(np.abs(decoded[70:] - 10.0).max(), 0.05)
+
+    def test_spec(self):
+        spec = json.loads(json.dumps(self.codec.spec()))
+        codec = PredictiveCodec.from_spec(spec)
+        np.testing.assert_array_equal(codec.encode_array(self.vals),
+                                      self.codec.encode_array(self.vals))
+        with self.assertRaises(DiscretizerException):
+            PredictiveCodec.from_spec({'keyframe': spec['keyframe']})
+
+    def test_invalid(self):
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        with self.assertRaises(DiscretizerException):
+            PredictiveCodec(d, None)
+        with self.assertRaises(DiscretizerException):
+            PredictiveCodec(d, d, 0)
+        codec = PredictiveCodec(LinearDiscretizer(2, 0.0, 1.0), d, 10)
+        with self.assertRaises(DiscretizerException):
+            codec.decode_array(bytearray(12))
+        with self.assertRaises(DiscretizerException):
+            codec.encode_array([1, 2])
+        with self.assertRaises(DiscretizerException):
+            PredictiveCodec(LinearDiscretizer(1, 0.0, 1.0, num_bits=4), d,
+                            10).decode_array(bytearray([255]))
+
+
+if __name__ == '__main__':
+    unittest.main()
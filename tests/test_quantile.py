@@ -0,0 +1,134 @@
+import json
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    QuantileDiscretizer, discretizer_from_spec
+
+
+class TestQuantileDiscretizer(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.sample = rng.lognormal(0.0, 1.0, 20000)
+        self.d = QuantileDiscretizer.fit(1, self.sample)
+
+    def test_fit(self):
+        d = self.d
+        self.assertEqual(d.num_buckets, 256)
+        self.assertEqual(d.edges.size, 255)
+        self.assertEqual(d.values.size, 256)
+        # the range covers the whole sample, not just the bucket values
+        self.assertEqual(d.val_min, self.sample.min())
+        self.assertEqual(d.val_max, self.sample.max())
+        lower, upper = d.bucket_ranges([0, d.max_bucket])
+        self.assertEqual(lower[0], self.sample.min())
+        self.assertEqual(upper[1], self.sample.max())
+        stats = d.enable_stats()
+        d.encode_array(self.sample)
+        self.assertEqual(stats.below_range, 0)
+        self.assertEqual(stats.above_range, 0)
+        d.disable_stats()
+
+        # roughly the same number of sample values in every bucket
+        counts = np.bincount(d.vals_to_bucket_nums(self.sample).astype(int),
+                             minlength=256)
+        self.assertLess(counts.max() - counts.min(), 5)
+
+        # skewed data is reconstructed better than with a linear mapping
+        lin = LinearDiscretizer(1, float(self.sample.min()),
+                                float(self.sample.max()))
+        err_q = np.abs(d.decode_array(d.encode_array(self.sample)) -
+                       self.sample)
+        err_l = np.abs(lin.decode_array(lin.encode_array(self.sample)) -
+                       self.sample)
+        self.assertLess(err_q.mean(), err_l.mean())
+        self.assertLess(np.median(err_q), np.median(err_l) / 10.0)
+
+    def test_bits(self):
+        d = QuantileDiscretizer.fit(None, self.sample, num_bits=10)
+        self.assertEqual(d.num_buckets, 1024)
+        self.assertEqual(d.num_bytes, 2)
+        d2 = discretizer_from_spec(d.spec())
+        np.testing.assert_array_equal(d2.encode_packed(self.sample),
+                                      d.encode_packed(self.sample))
+
+    def test_encdec(self):
+        d = self.d
+        vals = np.concatenate([self.sample[:500], d.edges,
+                               np.nextafter(d.edges, -np.inf),
+                               [-1.0, 0.0, 1e9, -np.inf, np.inf]])
+        buckets = d.vals_to_bucket_nums(vals)
+        for val, b in zip(vals, buckets):
+            self.assertEqual(d.val_to_bucket_num(float(val)), b)
+            self.assertEqual(d.encode(float(val)), bytearray([b]))
+        self.assertEqual(d.val_to_bucket_num(-1.0), 0)
+        self.assertEqual(d.val_to_bucket_num(1e9), 255)
+        np.testing.assert_array_equal(d.encode_array(vals),
+                                      buckets.astype(np.uint8))
+        d.use_encode_engine('table')
+        np.testing.assert_array_equal(d.encode_array(vals),
+                                      buckets.astype(np.uint8))
+
+        decoded = d.decode_array(d.encode_array(vals))
+        np.testing.assert_array_equal(decoded, d.values[buckets])
+        self.assertEqual(d.decode(bytearray([7])), d.values[7])
+        self.assertEqual(d.bucket_num_to_val(7), d.values[7])
+        d.use_lookup_table(False)
+        np.testing.assert_array_equal(d.decode_array(d.encode_array(vals)),
+                                      decoded)
+
+        self.assertRaises(DiscretizerException, d.encode, 1)
+        self.assertRaises(DiscretizerException, d.encode, float('nan'))
+        self.assertRaises(DiscretizerException, d.encode_array, [np.nan])
+        self.assertRaises(DiscretizerException, d.bucket_num_to_val, 256)
+        self.assertRaises(DiscretizerException, d.map_encoder, 0.5)
+
+    def test_spec(self):
+        spec = json.loads(json.dumps(self.d.spec()))
+        d = discretizer_from_spec(spec)
+        self.assertIsInstance(d, QuantileDiscretizer)
+        np.testing.assert_array_equal(d.edges, self.d.edges)
+        np.testing.assert_array_equal(d.values, self.d.values)
+        self.assertEqual(d.val_min, self.d.val_min)
+        self.assertEqual(d.val_max, self.d.val_max)
+        np.testing.assert_array_equal(d.encode_array(self.sample),
+                                      self.d.encode_array(self.sample))
+
+    def test_near_constant(self):
+        # nearly every bucket holds the repeated value
+        sample = np.concatenate([np.ones(5000), [2.0]])
+        d = QuantileDiscretizer.fit(1, sample)
+        self.assertEqual((d.val_min, d.val_max), (1.0, 2.0))
+        self.assertTrue(np.all(d.values == 1.0))
+        np.testing.assert_array_equal(
+            d.decode_array(d.encode_array(sample)), np.ones(sample.size))
+        d2 = discretizer_from_spec(d.spec())
+        self.assertEqual((d2.val_min, d2.val_max), (1.0, 2.0))
+
+    def test_invalid(self):
+        self.assertRaises(DiscretizerException, QuantileDiscretizer.fit,
+                          3, self.sample)
+        self.assertRaises(DiscretizerException, QuantileDiscretizer.fit,
+                          0, self.sample)
+        self.assertRaises(DiscretizerException, QuantileDiscretizer.fit,
+                          1, [1, 2, 3])
+        self.assertRaises(DiscretizerException, QuantileDiscretizer.fit,
+                          1, [1.0, 1.0, np.nan])
+        self.assertRaises(DiscretizerException, QuantileDiscretizer,
+                          1, self.d.edges[:-1], self.d.values)
+        self.assertRaises(DiscretizerException, QuantileDiscretizer,
+                          1, self.d.edges[::-1], self.d.values)
+        self.assertRaises(DiscretizerException, QuantileDiscretizer,
+                          1, self.d.edges, self.d.values[::-1])
+        self.assertRaises(DiscretizerException, QuantileDiscretizer,
+                          1, self.d.edges, self.d.values,
+                          val_min=float(self.d.values[1]))
+        self.assertRaises(DiscretizerException, QuantileDiscretizer,
+                          1, self.d.edges, self.d.values,
+                          val_max=float(self.d.edges[-1]) - 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
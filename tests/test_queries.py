@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import LinearDiscretizer, CubeRootDiscretizer, \
+    SigmoidDiscretizer, QuantileDiscretizer, DiscretizerException, \
+    BucketIndex
+
+
+def _discretizers():
+    rng = np.random.RandomState(3)
+    return [LinearDiscretizer(1, -10.0, 20.0),
+            LinearDiscretizer(3, -10.0, 20.0),
+            CubeRootDiscretizer(2, -10.0, 20.0),
+            SigmoidDiscretizer(2, -10.0, 20.0, 20.0),
+            SigmoidDiscretizer(5, -10.0, 20.0, 20.0),
+            LinearDiscretizer(2, -10.0, 20.0, num_bits=11),
+            QuantileDiscretizer.fit(1, rng.normal(0.0, 5.0, 1000))]
+
+
+class TestRangeQueries(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.vals = rng.uniform(-15.0, 25.0, 5000)
+
+    def test_bucket_bounds(self):
+        for d in _discretizers():
+            self.assertEqual(d.bucket_bounds(), (0, d.max_bucket))
+            self.assertEqual(d.bucket_bounds(-np.inf, np.inf),
+                             (0, d.max_bucket))
+            self.assertEqual(d.bucket_bounds(-np.inf, np.inf, False),
+                             (0, d.max_bucket))
+            b_lo, b_hi = d.bucket_bounds(-1.0, 3.0)
+            self.assertEqual(b_lo, d.val_to_bucket_num(-1.0))
+            self.assertEqual(b_hi, d.val_to_bucket_num(3.0))
+            i_lo, i_hi = d.bucket_bounds(-1.0, 3.0, conservative=False)
+            self.assertIn(i_lo - b_lo, (0, 1))
+            self.assertIn(b_hi - i_hi, (0, 1))
+
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        with self.assertRaises(DiscretizerException):
+            d.bucket_bounds(2.0, 1.0)
+        with self.assertRaises(DiscretizerException):
+            d.bucket_bounds(float('nan'), 1.0)
+        with self.assertRaises(DiscretizerException):
+            d.bucket_bounds(0, 1.0)
+
+    def test_filter_range(self):
+        for d in _discretizers():
+            buf = d.encode_array(self.vals)
+            decoded = d.decode_array(buf)
+            for lo, hi in ((-1.0, 3.0), (None, 0.0), (5.0, None),
+                           (-30.0, -20.0), (2.0, 2.0)):
+                outer = d.filter_range(buf, lo, hi)
+                inner = d.filter_range(buf, lo, hi, conservative=False)
+                exact = np.ones(self.vals.size, dtype=bool)
+                if lo is not None:
+                    exact &= self.vals >= lo
+                if hi is not None:
+                    exact &= self.vals <= hi
+                # conservative filters never miss a match, inner filters
+                # never report a non-match
+                self.assertFalse(np.any(exact & ~outer))
+                self.assertFalse(np.any(inner & ~exact))
+                # both agree with comparing the buckets of decoded values
+                b_lo, b_hi = d.bucket_bounds(lo, hi)
+                bucket_nums = d.vals_to_bucket_nums(decoded)
+                np.testing.assert_array_equal(
+                    outer, (bucket_nums >= b_lo) & (bucket_nums <= b_hi))
+
+    def test_index(self):
+        for d in _discretizers():
+            buf = d.encode_array(self.vals)
+            index = BucketIndex(buf, d)
+            self.assertEqual(len(index), self.vals.size)
+            for lo, hi in ((-1.0, 3.0), (None, 0.0), (5.0, None),
+                           (-30.0, -20.0)):
+                for conservative in (True, False):
+                    mask = d.filter_range(buf, lo, hi, conservative)
+                    np.testing.assert_array_equal(
+                        index.query(lo, hi, conservative),
+                        np.flatnonzero(mask))
+                    self.assertEqual(index.count(lo, hi, conservative),
+                                     int(mask.sum()))
+
+    def test_index_empty(self):
+        d = LinearDiscretizer(2, 0.0, 1.0)
+        index = BucketIndex(bytearray(), d)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.query(0.2, 0.4).size, 0)
+        self.assertEqual(index.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import DiscretizerException, LinearDiscretizer, \
+    CubeRootDiscretizer, SigmoidDiscretizer, RecordCodec
+
+
+class TestRecordCodec(unittest.TestCase):
+    def setUp(self):
+        self.schema = [('temp', SigmoidDiscretizer(2, 15.0, 25.0, 10.0)),
+                       ('flow', LinearDiscretizer(1, 0.0, 100.0)),
+                       ('load', CubeRootDiscretizer(3, -1.0, 1.0))]
+        self.codec = RecordCodec(self.schema)
+        rng = np.random.RandomState(0)
+        self.records = np.empty(500, dtype=self.codec.dtype)
+        self.records['temp'] = rng.uniform(10.0, 30.0, 500)
+        self.records['flow'] = rng.uniform(0.0, 100.0, 500)
+        self.records['load'] = rng.uniform(-1.0, 1.0, 500)
+
+    def test_layout(self):
+        self.assertEqual(self.codec.names, ('temp', 'flow', 'load'))
+        self.assertEqual(self.codec.record_size, 6)
+        self.assertEqual(self.codec.field_offset('flow'), 2)
+        self.assertEqual(self.codec.field_offset('load'), 3)
+        self.assertRaises(DiscretizerException, self.codec.field_offset, 'x')
+        codec = RecordCodec([LinearDiscretizer(1, 0.0, 1.0)] * 2)
+        self.assertEqual(codec.names, ('f0', 'f1'))
+        codec = RecordCodec.from_spec(self.codec.spec())
+        self.assertEqual(codec.spec(), self.codec.spec())
+
+    def test_invalid_schema(self):
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        self.assertRaises(DiscretizerException, RecordCodec, [])
+        self.assertRaises(DiscretizerException, RecordCodec, [1.0])
+        self.assertRaises(DiscretizerException, RecordCodec, [(1, d)])
+        self.assertRaises(DiscretizerException, RecordCodec, [('a', 1.0)])
+        self.assertRaises(DiscretizerException, RecordCodec,
+                          [('a', d), ('a', d)])
+
+    def test_scalar(self):
+        record = (20.5, 42.0, 0.25)
+        ba = self.codec.encode(record)
+        self.assertEqual(ba, self.schema[0][1].encode(20.5) +
+                         self.schema[1][1].encode(42.0) +
+                         self.schema[2][1].encode(0.25))
+        decoded = self.codec.decode(ba)
+        for val, d, out in zip(record, self.schema, decoded):
+            self.assertEqual(out, d[1].decode(d[1].encode(val)))
+        self.assertRaises(DiscretizerException, self.codec.encode, (1.0,))
+        self.assertRaises(DiscretizerException, self.codec.decode, b'abcdef')
+        self.assertRaises(DiscretizerException, self.codec.decode,
+                          bytearray(5))
+
+    def test_batch(self):
+        buf = self.codec.encode_array(self.records)
+        self.assertEqual(buf.size, 500 * 6)
+        expected = bytearray()
+        for record in self.records[:20]:
+            expected += self.codec.encode(tuple(float(x) for x in record))
+        self.assertEqual(buf[:120].tobytes(), bytes(expected))
+
+        plain = np.column_stack([self.records[n] for n in self.codec.names])
+        np.testing.assert_array_equal(self.codec.encode_array(plain), buf)
+        np.testing.assert_array_equal(
+            self.codec.encode_array([tuple(r) for r in plain]), buf)
+
+        out = self.codec.decode_array(buf)
+        self.assertEqual(out.dtype, self.codec.dtype)
+        for name, d in self.schema:
+            expected = d.decode_array(d.encode_array(self.records[name]))
+            np.testing.assert_array_equal(out[name], expected)
+            np.testing.assert_array_equal(
+                self.codec.decode_field(buf.tobytes(), name), expected)
+
+        self.assertEqual(self.codec.encode_array([]).size, 0)
+        self.assertEqual(self.codec.decode_array(b'').size, 0)
+        self.assertRaises(DiscretizerException, self.codec.encode_array,
+                          np.zeros((3, 2)))
+        self.assertRaises(DiscretizerException, self.codec.decode_array,
+                          bytes(7))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import unittest
+
+import numpy as np
+
+import env
+from discretizer import LinearDiscretizer, SigmoidDiscretizer
+
+
+class TestStats(unittest.TestCase):
+    def test_disabled(self):
+        d = LinearDiscretizer(1, 0.0, 1.0)
+        self.assertIsNone(d.stats)
+        d.encode(0.5)
+        self.assertIsNone(d.stats)
+
+    def test_scalar(self):
+        d = LinearDiscretizer(1, -10.0, 20.0)
+        stats = d.enable_stats()
+        self.assertIs(d.stats, stats)
+        for val in (-11.0, -10.0, 5.0, 20.0, 21.0, 22.0):
+            self.assertEqual(d.encode(val), bytearray(
+                [d.val_to_bucket_num(val)]))
+        self.assertAlmostEqual(d.decode(bytearray([128])), 5.0588, 4)
+
+        out = stats.as_dict()
+        self.assertEqual(out['below_range'], 1)
+        self.assertEqual(out['above_range'], 2)
+        self.assertEqual(out['in_range'], 3)
+        self.assertEqual(out['encode']['calls'], 6)
+        self.assertEqual(out['encode']['values'], 6)
+        self.assertEqual(sum(out['encode']['latency_ns'].values()), 6)
+        self.assertEqual(out['decode']['calls'], 1)
+        hist = out['histogram']
+        self.assertEqual(hist['buckets_per_bin'], 1)
+        self.assertEqual(hist['bins_used'], 3)
+        self.assertEqual(hist['counts'][0], 2)
+        self.assertEqual(hist['counts'][128], 1)
+        self.assertEqual(hist['counts'][255], 3)
+        json.dumps(out)
+
+        stats.reset()
+        self.assertEqual(stats.as_dict()['encode']['calls'], 0)
+        self.assertEqual(stats.as_dict()['histogram']['bins_used'], 0)
+        d.disable_stats()
+        self.assertIsNone(d.stats)
+
+    def test_batch(self):
+        d = SigmoidDiscretizer(3, -5.0, 5.0, 20.0)
+        stats = d.enable_stats(timing=False)
+        vals = np.linspace(-6.0, 6.0, 1201)
+        buf = d.encode_array(vals)
+        d.disable_stats()
+        np.testing.assert_array_equal(buf, d.encode_array(vals))
+        d.enable_stats(timing=False)
+        d.encode_array(vals)
+        d.decode_array(buf)
+        out = d.stats.as_dict()
+        self.assertEqual(out['below_range'], 100)
+        self.assertEqual(out['above_range'], 100)
+        self.assertEqual(out['in_range'], 1001)
+        self.assertEqual(out['encode'], {'calls': 1, 'values': 1201})
+        self.assertEqual(out['decode'], {'calls': 1, 'values': 1201})
+        self.assertEqual(out['histogram']['buckets_per_bin'], 256)
+        self.assertEqual(sum(out['histogram']['counts']), 1201)
+        self.assertIsNot(stats, d.stats)
+
+    def test_no_histogram(self):
+        d = LinearDiscretizer(2, 0.0, 1.0)
+        d.enable_stats(histogram=False)
+        d.encode_array([0.5, 2.0])
+        out = d.stats.as_dict()
+        self.assertNotIn('histogram', out)
+        self.assertEqual(out['above_range'], 1)
+        self.assertGreater(out['encode']['total_ns'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()